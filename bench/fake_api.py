@@ -0,0 +1,181 @@
+"""Локальная замена Telegram Bot API для нагрузочных тестов.
+
+Отвечает на методы, которыми пользуется бот, считает вызовы, умеет
+добавлять задержку и иногда отвечать 429 (flood control).
+"""
+
+import asyncio
+import io
+import itertools
+import json
+import multiprocessing
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+CHANNEL_ID = -1001234567890
+
+
+def _jpeg_bytes() -> bytes:
+    try:
+        from PIL import Image
+    except ImportError:
+        return b"\xff\xd8\xff\xd9"
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (120, 120, 120)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class FakeBotAPI:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        retry_after_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.calls: Counter[str] = Counter()
+        self.flood_errors = 0
+        self._random = random.Random(seed)
+        self._message_ids = itertools.count(1)
+        self._photo = _jpeg_bytes()
+        self._runner: web.AppRunner | None = None
+
+    # --- сервер ---
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/file/bot{token}/{path:.*}", self.handle_file)
+        app.router.add_get("/stats", self.handle_stats)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        # большой backlog: иначе тысячи одновременных соединений ловят
+        # повторы SYN и секундные задержки, которых нет у настоящего API
+        site = web.TCPSite(self._runner, host, port, backlog=4096)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    # --- ответы ---
+
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    def _chat(self, chat_id) -> dict:
+        if isinstance(chat_id, str) and chat_id.startswith("@"):
+            return {"id": CHANNEL_ID, "type": "channel", "username": chat_id[1:]}
+        return {"id": int(chat_id), "type": "private"}
+
+    def _message(self, chat_id, **fields) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+            **fields,
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        self.calls[method] += 1
+        params = dict(await request.post())
+
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if method.startswith("send") and self._random.random() < self.retry_after_rate:
+            self.flood_errors += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+
+        if method == "getme":
+            return self._ok({"id": 42, "is_bot": True, "first_name": "Bench", "username": "bench_bot"})
+        if method == "getchatmember":
+            user_id = int(params["user_id"])
+            return self._ok(
+                {
+                    "status": "member",
+                    "user": {"id": user_id, "is_bot": False, "first_name": "User"},
+                }
+            )
+        if method == "sendmessage":
+            return self._ok(self._message(params["chat_id"], text=params.get("text", "")))
+        if method == "sendmediagroup":
+            media = json.loads(params["media"])
+            return self._ok(
+                [
+                    self._message(
+                        params["chat_id"],
+                        photo=[
+                            {
+                                "file_id": item["media"],
+                                "file_unique_id": item["media"],
+                                "width": 64,
+                                "height": 48,
+                            }
+                        ],
+                    )
+                    for item in media
+                ]
+            )
+        if method == "getfile":
+            file_id = params["file_id"]
+            return self._ok(
+                {"file_id": file_id, "file_unique_id": file_id, "file_path": f"photos/{file_id}.jpg"}
+            )
+        if method.startswith("edit"):
+            return self._ok(self._message(params.get("chat_id", 0), text=params.get("text", "")))
+        # answerCallbackQuery, setWebhook, deleteWebhook и прочее
+        return self._ok(True)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"calls": dict(self.calls), "flood_errors": self.flood_errors}
+        )
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        self.calls["download"] += 1
+        return web.Response(body=self._photo, content_type="image/jpeg")
+
+
+def _serve(port: int, options: dict, ready) -> None:
+    async def main():
+        api = FakeBotAPI(**options)
+        ready.send(await api.start(port=port))
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def start_in_process(port: int = 0, **options) -> tuple[str, multiprocessing.Process]:
+    """Запускаем заглушку в отдельном процессе, чтобы она не отнимала CPU
+    у измеряемого бота. Счётчики доступны по ``GET /stats``."""
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe()
+    process = ctx.Process(target=_serve, args=(port, options, child), daemon=True)
+    process.start()
+    return parent.recv(), process
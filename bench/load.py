@@ -0,0 +1,205 @@
+"""Сквозной нагрузочный тест: синтетические пользователи проходят весь
+сценарий ReportGuest, админы модерируют заявки, Bot API — локальная заглушка.
+
+    python -m bench.load --users 2000 --concurrency 500 --latency 0.05
+
+Отчёт: перцентили задержки хендлеров по шагам, апдейтов в секунду,
+вызовов Bot API на заявку и пиковый RSS процесса.
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+ADMIN_IDS = (1, 2, 3)
+
+
+def configure_env(args, data_dir: str) -> None:
+    """Конфиг бота читается при импорте, поэтому задаём его до импорта."""
+    os.environ.update(
+        {
+            "BOT_TOKEN": "42:BENCH",
+            "ADMIN_IDS": ",".join(map(str, ADMIN_IDS)),
+            "REPORTS_DB": os.path.join(data_dir, "reports.db"),
+            "FSM_DB": os.path.join(data_dir, "fsm.db"),
+            "MEDIA_GROUP_WINDOW": str(args.album_window),
+            "PHOTO_HASHING": "1" if args.photo_hashing else "0",
+        }
+    )
+    if not args.real_limits:
+        os.environ["SEND_RATE_GLOBAL"] = "1000000"
+        os.environ["SEND_RATE_PER_CHAT"] = "1000000"
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run(args) -> None:
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.types import Update
+
+    import aiohttp
+
+    from bench.fake_api import start_in_process
+    from bench.updates import callback_update, message_update, photo_update
+    from bot import handlers
+    from bot.config import FSM_DB
+    from bot.fsm_storage import SQLiteStorage
+    from bot.reports import STATUS_PENDING, STATUS_PUBLISHED
+
+    base, api_process = start_in_process(
+        latency=args.latency,
+        jitter=args.jitter,
+        retry_after_rate=args.retry_after_rate,
+    )
+    bot = Bot(
+        token="42:BENCH",
+        session=AiohttpSession(api=TelegramAPIServer.from_base(base), limit=1000),
+        default=DefaultBotProperties(parse_mode="HTML"),
+    )
+    dp = Dispatcher(storage=SQLiteStorage(FSM_DB))
+    dp.include_router(handlers.router)
+    if args.metrics_port:
+        from run import setup_metrics
+
+        setup_metrics(dp, [bot], args.metrics_port)
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: Counter[str] = Counter()
+    updates_fed = 0
+
+    async def feed(step: str, raw: dict) -> None:
+        nonlocal updates_fed
+        update = Update.model_validate(raw, context={"bot": bot})
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            errors[f"{step}: {type(e).__name__}"] += 1
+        latencies[step].append(time.perf_counter() - started)
+        updates_fed += 1
+
+    async def user_flow(user_id: int) -> None:
+        await feed("start", message_update(user_id, "/start"))
+        await feed("add_guest", callback_update(user_id, "add_guest"))
+        await feed("country", callback_update(user_id, "country:Россия"))
+        await feed("city", message_update(user_id, "Москва"))
+        await feed("guest_name", message_update(user_id, f"Иванов Иван {user_id}"))
+        await feed("phone", message_update(user_id, f"7978{user_id % 10_000_000:07d}"))
+        await feed("description", message_update(user_id, "Сломал мебель, не заплатил."))
+        album = f"album-{user_id}"
+        await asyncio.gather(
+            *(
+                feed("photo", photo_update(user_id, f"photo-{user_id}-{i}", album))
+                for i in range(args.photos)
+            )
+        )
+        await feed("confirm", message_update(user_id, "Подтвердить"))
+
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def limited(user_id: int) -> None:
+        async with sem:
+            await user_flow(user_id)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(10_000 + i) for i in range(args.users)))
+    submit_time = time.perf_counter() - started
+
+    # ждём рассылку админам (кнопки к альбомам outbox ставит сам), затем
+    # модерируем всё, что пришло
+    while handlers.background_tasks or handlers.outbox.depth:
+        await asyncio.sleep(0.05)
+    pending = await handlers.report_store.find_by_status(STATUS_PENDING, limit=args.users)
+
+    async def moderate(index: int, report: dict) -> None:
+        async with sem:
+            admin_id = ADMIN_IDS[index % len(ADMIN_IDS)]
+            action = "mod_reject" if index % args.reject_every == 0 else "mod_approve"
+            await feed(action, callback_update(admin_id, f"{action}:{report['id']}"))
+
+    moderation_started = time.perf_counter()
+    await asyncio.gather(*(moderate(i, r) for i, r in enumerate(pending)))
+    while handlers.outbox.depth or handlers.outbox._timers:
+        await asyncio.sleep(0.05)
+    total_time = time.perf_counter() - started
+    moderation_time = time.perf_counter() - moderation_started
+
+    published = await handlers.report_store.find_by_status(STATUS_PUBLISHED, limit=args.users)
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    await dp.emit_shutdown(bot=bot, dispatcher=dp)
+    await bot.session.close()
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base}/stats") as resp:
+            api_stats = await resp.json()
+    api_process.terminate()
+    calls = api_stats["calls"]
+    total_calls = sum(calls.values())
+
+    reports = len(pending)
+    print(f"пользователей: {args.users}, заявок: {reports}, опубликовано: {len(published)}")
+    print(f"сценарий: {submit_time:.2f} с, модерация: {moderation_time:.2f} с, всего: {total_time:.2f} с")
+    print(f"апдейтов: {updates_fed}, {updates_fed / total_time:.0f} апд/с")
+    print(
+        f"вызовов Bot API: {total_calls} ({total_calls / max(reports, 1):.1f} на заявку), "
+        f"429: {api_stats['flood_errors']}"
+    )
+    for method, count in sorted(calls.items()):
+        print(f"  {method:<22} {count}")
+    if errors:
+        print("ошибки хендлеров:")
+        for name, count in errors.most_common():
+            print(f"  {name:<32} {count}")
+    print(f"пиковый RSS: {rss_peak / 1024:.1f} МБ (до сценария {rss_before / 1024:.1f} МБ)")
+    print()
+    print(f"{'шаг':<12} {'n':>7} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'сред., мс':>10}")
+    for step, values in latencies.items():
+        print(
+            f"{step:<12} {len(values):>7} "
+            f"{percentile(values, 50) * 1000:>9.2f} "
+            f"{percentile(values, 95) * 1000:>9.2f} "
+            f"{percentile(values, 99) * 1000:>9.2f} "
+            f"{statistics.fmean(values) * 1000:>10.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--photos", type=int, default=3, help="фото в альбоме каждой заявки")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка Bot API, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, с")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--reject-every", type=int, default=5, help="отклонять каждую N-ю заявку")
+    parser.add_argument("--album-window", type=float, default=0.2)
+    parser.add_argument("--photo-hashing", action="store_true")
+    parser.add_argument("--real-limits", action="store_true", help="лимиты отправки как в проде")
+    parser.add_argument("--metrics-port", type=int, default=0, help="включить метрики на этом порту")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        configure_env(args, data_dir)
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Микробенчмарк нормализации номеров: разбор в E.164 и загрузка индексов.
+
+    python -m bench.phones --numbers 200000
+
+Номера генерируются в разных записях (+7 …, 8 …, 00…, без кода) и для
+разных стран; отчёт — номеров в секунду для to_e164 и строк в секунду
+для PhoneIndex.bulk_load и InlineSearch.bulk_load.
+"""
+
+import argparse
+import random
+import time
+
+from bot.e164 import RULES, to_e164
+from bot.inline_search import InlineSearch
+from bot.phone_index import PhoneIndex
+
+NAMES = ("Иванов Иван", "Петров Пётр", "Сидорова Анна", "Smith John", "Ким Ольга")
+
+
+def generate(count: int, seed: int = 0) -> list[tuple[str, str]]:
+    """Пары (номер, код страны из анкеты)."""
+    rng = random.Random(seed)
+    # чаще всего приходят российские номера
+    rules = [RULES[0]] * len(RULES) + list(RULES)
+    numbers = []
+    for _ in range(count):
+        rule = rng.choice(rules)
+        length = rng.choice(sorted(rule.lengths))
+        national = "".join(rng.choice("0123456789") for _ in range(length))
+        national = str(rng.randint(1, 9)) + national[1:]
+        style = rng.randrange(4)
+        if style == 0:
+            number = f"+{rule.code} {national[:3]} {national[3:6]}-{national[6:]}"
+        elif style == 1:
+            number = f"00{rule.code}{national}"
+        elif style == 2 and rule.trunk:
+            number = f"{rule.trunk} ({national[:3]}) {national[3:]}"
+        else:
+            number = f"{rule.code}{national}"
+        numbers.append((number, rule.code))
+    return numbers
+
+
+def measure(label: str, fn, count: int) -> None:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.3f} с {count / elapsed:12.0f} /с")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--numbers", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    numbers = generate(args.numbers, args.seed)
+    # в базе номера уже канонические, но старые записи — как ввели
+    rows = [(f"r{i}", phone) for i, (phone, _) in enumerate(numbers)]
+    named = [(report_id, phone, NAMES[i % len(NAMES)]) for i, (report_id, phone) in enumerate(rows)]
+
+    parsed = [to_e164(number, code) for number, code in numbers]
+    print(f"номеров: {len(numbers)}, не разобрано: {parsed.count(None)}")
+    measure("to_e164", lambda: [to_e164(number, code) for number, code in numbers], len(numbers))
+    measure("PhoneIndex.bulk_load", lambda: PhoneIndex().bulk_load(rows), len(rows))
+    measure("InlineSearch.bulk_load", lambda: InlineSearch().bulk_load(named), len(named))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Генератор синтетических апдейтов Telegram (сырые dict, как в вебхуке)."""
+
+import itertools
+import time
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> dict:
+    return {
+        "id": user_id,
+        "is_bot": False,
+        "first_name": f"User{user_id}",
+        "username": f"user{user_id}",
+    }
+
+
+def _message(user_id: int, **fields) -> dict:
+    return {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        **fields,
+    }
+
+
+def message_update(user_id: int, text: str) -> dict:
+    fields = {"text": text}
+    if text.startswith("/"):
+        command = text.split(maxsplit=1)[0]
+        fields["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": next(_update_ids), "message": _message(user_id, **fields)}
+
+
+def photo_update(
+    user_id: int,
+    file_id: str,
+    media_group_id: str | None = None,
+) -> dict:
+    fields = {
+        "photo": [
+            {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "width": 1280,
+                "height": 960,
+            }
+        ]
+    }
+    if media_group_id:
+        fields["media_group_id"] = media_group_id
+    return {"update_id": next(_update_ids), "message": _message(user_id, **fields)}
+
+
+def callback_update(user_id: int, data: str, message_chat_id: int | None = None) -> dict:
+    chat_id = message_chat_id if message_chat_id is not None else user_id
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": next(_message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": "…",
+            },
+        },
+    }
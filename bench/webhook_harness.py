@@ -0,0 +1,93 @@
+"""Нагрузочная проверка вебхука без Telegram.
+
+Поднимает ``WebhookServer`` на локальном порту с тестовым хендлером
+заданной задержки и отправляет в него поток синтетических апдейтов.
+
+    python -m bench.webhook_harness --updates 20000 --users 500 --handler-delay 0.05
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+
+from bot.webhook import SECRET_HEADER, WebhookServer
+from bench.updates import message_update
+
+SECRET = "harness-secret"
+
+
+def make_dispatcher(handler_delay: float) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def slow_handler(message: Message):
+        await asyncio.sleep(handler_delay)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def main(args) -> None:
+    bot = Bot(token="42:HARNESS")
+    server = WebhookServer(
+        make_dispatcher(args.handler_delay),
+        bot,
+        secret=SECRET,
+        workers=args.workers,
+        queue_size=args.queue_size,
+    )
+    runner = web.AppRunner(server.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+
+    url = f"http://127.0.0.1:{args.port}{server.path}"
+    updates = [
+        message_update(1000 + i % args.users, f"text {i}") for i in range(args.updates)
+    ]
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async with aiohttp.ClientSession(headers={SECRET_HEADER: SECRET}) as session:
+
+        async def post(update: dict) -> int:
+            async with sem:
+                async with session.post(url, json=update) as resp:
+                    return resp.status
+
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(post(u) for u in updates))
+        accepted = time.perf_counter() - started
+
+        async with session.post(url, json=updates[0], headers={SECRET_HEADER: "bad"}) as resp:
+            bad_secret_status = resp.status
+
+    while server.processed < len(updates):
+        await asyncio.sleep(0.01)
+    finished = time.perf_counter() - started
+
+    await runner.cleanup()
+    await bot.session.close()
+
+    ok = sum(1 for s in statuses if s == 200)
+    print(f"апдейтов:            {len(updates)} (200 OK: {ok})")
+    print(f"приём:               {accepted:.2f} с, {len(updates) / accepted:.0f} апд/с")
+    print(f"обработка:           {finished:.2f} с, {len(updates) / finished:.0f} апд/с")
+    print(f"неверный секрет ->   HTTP {bad_secret_status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--handler-delay", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+import weakref
+from typing import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingGroup:
+    __slots__ = ("items", "last_seen", "task")
+
+    def __init__(self):
+        self.items: list = []
+        self.last_seen = time.monotonic()
+        self.task: asyncio.Task | None = None
+
+
+class MediaGroupCollector:
+    """Собирает сообщения одного альбома (``media_group_id``) в одну пачку.
+
+    Telegram присылает альбом отдельными сообщениями почти одновременно.
+    Коллектор копит их, пока в течение ``window`` секунд не придёт ни одного
+    нового, и вызывает ``commit`` один раз со всеми элементами. Все
+    ``commit`` одного пользователя выполняются строго по очереди.
+    """
+
+    def __init__(self, window: float = 0.6):
+        self.window = window
+        self._groups: dict[tuple[Hashable, str], _PendingGroup] = {}
+        self._locks: weakref.WeakValueDictionary[Hashable, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def lock(self, user_key: Hashable) -> asyncio.Lock:
+        """Замок пользователя: под ним идут все изменения его списка фото."""
+        lock = self._locks.get(user_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[user_key] = lock
+        return lock
+
+    def add(
+        self,
+        user_key: Hashable,
+        media_group_id: str,
+        item,
+        commit: Callable[[list], Awaitable[None]],
+    ) -> None:
+        """Добавляем элемент альбома; ``commit`` первого сообщения альбома
+        получит все элементы, пришедшие в окне."""
+        key = (user_key, media_group_id)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _PendingGroup()
+            group.task = asyncio.create_task(self._flush_later(key, user_key, commit))
+        group.items.append(item)
+        group.last_seen = time.monotonic()
+
+    async def _flush_later(
+        self,
+        key: tuple[Hashable, str],
+        user_key: Hashable,
+        commit: Callable[[list], Awaitable[None]],
+    ) -> None:
+        group = self._groups[key]
+        # окно отсчитывается от последнего сообщения альбома
+        while (delay := group.last_seen + self.window - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+        lock = self.lock(user_key)
+        async with lock:
+            del self._groups[key]
+            try:
+                await commit(group.items)
+            except Exception:
+                logger.exception("Не удалось сохранить альбом %s", key)
+
+    async def drain(self, user_key: Hashable) -> None:
+        """Дожидаемся, пока все недособранные альбомы пользователя сохранятся."""
+        tasks = [
+            group.task
+            for (owner, _), group in list(self._groups.items())
+            if owner == user_key and group.task is not None
+        ]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,12 +1,102 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
-load_dotenv()
+# Окружение процесса до .env: при перезагрузке настроек оно так же
+# важнее файла, как и при старте
+PROCESS_ENV = dict(os.environ)
+ENV_FILE = Path(
+    os.getenv("ENV_FILE", str(Path(__file__).resolve().parent.parent / ".env"))
+)
+load_dotenv(ENV_FILE)
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-CHANNEL_USERNAME = os.getenv("CHANNEL_USERNAME", "@blacklistguests")
+# CHANNEL_USERNAME и ADMIN_IDS читает bot/settings.py: они перечитываются
+# по SIGHUP или при изменении .env, в хендлерах —
+# handlers.tenants.get(bot_id).settings.current
 
-# Список ID админов (для управления странами и т.п.)
-ADMIN_IDS = [
-    int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()
-]
+# Как часто проверять, не изменился ли .env (секунды, 0 — только по SIGHUP)
+CONFIG_WATCH_INTERVAL = float(os.getenv("CONFIG_WATCH_INTERVAL", "5"))
+
+# Несколько ботов в одном процессе (см. bot/tenants.py): JSON-файл со
+# списком ботов; пусто — один бот из BOT_TOKEN
+TENANTS_FILE = os.getenv("TENANTS_FILE", "")
+# Общий пул HTTP-соединений к Bot API на все боты процесса
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+
+# Кэш проверки подписки (секунды / количество пользователей)
+SUBSCRIPTION_TTL = float(os.getenv("SUBSCRIPTION_TTL", "300"))
+SUBSCRIPTION_NEGATIVE_TTL = float(os.getenv("SUBSCRIPTION_NEGATIVE_TTL", "15"))
+SUBSCRIPTION_CACHE_SIZE = int(os.getenv("SUBSCRIPTION_CACHE_SIZE", "10000"))
+
+# База заявок (SQLite)
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+REPORTS_DB = os.getenv("REPORTS_DB", str(DATA_DIR / "reports.db"))
+
+# Лимиты исходящих сообщений (сообщений в секунду)
+SEND_RATE_GLOBAL = float(os.getenv("SEND_RATE_GLOBAL", "30"))
+SEND_RATE_PER_CHAT = float(os.getenv("SEND_RATE_PER_CHAT", "1"))
+
+# Очередь исходящих сообщений
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_QUEUE = int(os.getenv("OUTBOX_MAX_QUEUE", "1000"))
+# Сколько секунд задание может суммарно ждать по flood control (429)
+OUTBOX_MAX_FLOOD_WAIT = float(os.getenv("OUTBOX_MAX_FLOOD_WAIT", "3600"))
+
+# Режим работы: polling (по умолчанию) или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+# Хранилище FSM-сессий (незавершённые заявки переживают перезапуск)
+FSM_DB = os.getenv("FSM_DB", str(DATA_DIR / "fsm.db"))
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "0.5"))
+FSM_SESSION_TTL = float(os.getenv("FSM_SESSION_TTL", str(7 * 24 * 3600)))
+
+# Несколько процессов-воркеров (только в режиме webhook)
+WORKER_PROCESSES = max(1, int(os.getenv("WORKER_PROCESSES", "1")))
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", "8100"))
+# Как часто подхватывать публикации других процессов и импорт архива
+INDEX_SYNC_INTERVAL = float(os.getenv("INDEX_SYNC_INTERVAL", "5"))
+
+# Сколько секунд ждать остальные фото альбома
+MEDIA_GROUP_WINDOW = float(os.getenv("MEDIA_GROUP_WINDOW", "0.6"))
+
+# Поиск повторно присланных фото по перцептивному хэшу (нужен Pillow)
+PHOTO_HASHING = os.getenv("PHOTO_HASHING", "0") == "1"
+PHOTO_HASH_DISTANCE = int(os.getenv("PHOTO_HASH_DISTANCE", "6"))
+PHOTO_HASH_TIMEOUT = float(os.getenv("PHOTO_HASH_TIMEOUT", "20"))
+
+# Метрики Prometheus: 0 — выключены (никаких middleware, ноль накладных);
+# процессы-воркеры слушают METRICS_PORT + 1 + номер воркера
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Сэмплирующий профайлер на /profile?seconds=N
+METRICS_PROFILER = os.getenv("METRICS_PROFILER", "0") == "1"
+
+# Inline-поиск: сколько запросов держать в кэше и сколько результатов на страницу
+INLINE_CACHE_SIZE = int(os.getenv("INLINE_CACHE_SIZE", "1024"))
+INLINE_PAGE_SIZE = min(50, int(os.getenv("INLINE_PAGE_SIZE", "20")))
+
+# Заявки без решения: через сколько секунд закрывать (0 — никогда),
+# с какого возраста напоминать админам и как часто слать сводку (0 — не слать)
+PENDING_EXPIRE_AFTER = float(os.getenv("PENDING_EXPIRE_AFTER", str(7 * 24 * 3600)))
+PENDING_REMIND_AFTER = float(os.getenv("PENDING_REMIND_AFTER", str(6 * 3600)))
+PENDING_DIGEST_INTERVAL = float(os.getenv("PENDING_DIGEST_INTERVAL", str(3 * 3600)))
+
+# Ограничение частоты апдейтов от одного пользователя (админов не касается):
+# в секунду и запас подряд; лишнее отбрасывается. THROTTLING=0 — выключить
+THROTTLING = os.getenv("THROTTLING", "1") == "1"
+THROTTLE_CALLBACK_RATE = float(os.getenv("THROTTLE_CALLBACK_RATE", "2"))
+THROTTLE_CALLBACK_BURST = float(os.getenv("THROTTLE_CALLBACK_BURST", "5"))
+THROTTLE_TEXT_RATE = float(os.getenv("THROTTLE_TEXT_RATE", "1"))
+THROTTLE_TEXT_BURST = float(os.getenv("THROTTLE_TEXT_BURST", "5"))
+# альбом приходит пачкой до 10 фото, поэтому запас больше
+THROTTLE_PHOTO_RATE = float(os.getenv("THROTTLE_PHOTO_RATE", "2"))
+THROTTLE_PHOTO_BURST = float(os.getenv("THROTTLE_PHOTO_BURST", "20"))
+THROTTLE_MAX_USERS = int(os.getenv("THROTTLE_MAX_USERS", "50000"))
@@ -1,18 +1,76 @@
 import json
+import os
+import tempfile
+import threading
 from pathlib import Path
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 COUNTRIES_FILE = DATA_DIR / "countries.json"
+DEFAULT_COUNTRIES = ("Россия", "Казахстан", "Беларусь", "Абхазия")
 
 
-def load_countries() -> list[str]:
-    if not COUNTRIES_FILE.exists():
-        return ["Россия", "Казахстан", "Беларусь", "Абхазия"]
-    with COUNTRIES_FILE.open("r", encoding="utf-8") as f:
-        return json.load(f)
+class CountryList:
+    """Список стран в JSON-файле (у каждого бота может быть свой)."""
 
+    def __init__(self, path: str | Path = COUNTRIES_FILE):
+        self.path = Path(path)
+        # Снимок списка в памяти: (mtime_ns файла, страны)
+        self._snapshot: tuple[int | None, tuple[str, ...]] | None = None
+        self._lock = threading.Lock()
+
+    def _file_mtime(self) -> int | None:
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self) -> tuple[str, ...]:
+        """Неизменяемый снимок списка стран.
+
+        Файл перечитывается только если изменилось его mtime, поэтому
+        обычный вызов стоит одного stat(). Пока список не менялся, метод
+        возвращает один и тот же объект — на это опирается кэш клавиатуры.
+        """
+        mtime = self._file_mtime()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == mtime:
+            return snapshot[1]
+
+        with self._lock:
+            if self._snapshot is not None and self._snapshot[0] == mtime:
+                return self._snapshot[1]
+            if mtime is None:
+                countries = DEFAULT_COUNTRIES
+            else:
+                with self.path.open("r", encoding="utf-8") as f:
+                    countries = tuple(json.load(f))
+            self._snapshot = (mtime, countries)
+            return countries
+
+    def load(self) -> list[str]:
+        return list(self.get())
+
+    def save(self, countries: list[str]) -> None:
+        """Атомарно сохраняем список: пишем во временный файл и переименовываем."""
+        directory = self.path.parent
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory, prefix=f".{self.path.stem}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(countries, f, ensure_ascii=False, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._snapshot = (self._file_mtime(), tuple(countries))
+
+
+# Список по умолчанию (data/countries.json)
+default_countries = CountryList()
 
-def save_countries(countries: list[str]) -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with COUNTRIES_FILE.open("w", encoding="utf-8") as f:
-        json.dump(countries, f, ensure_ascii=False, indent=2)
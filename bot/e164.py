@@ -0,0 +1,187 @@
+"""Приведение телефонных номеров к E.164 (+<код страны><номер>).
+
+Правила стран (код, допустимая длина национального номера, префикс
+междугородней связи) один раз при импорте собираются в префиксное
+дерево по цифрам кода. Разбор номера — проход по дереву на 1–3 цифры и
+проверка длины, без регулярных выражений на каждый номер.
+"""
+import re
+from typing import NamedTuple
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+class CountryRule(NamedTuple):
+    code: str
+    # допустимые длины номера без кода страны
+    lengths: frozenset[int]
+    # префикс, который набирают внутри страны перед номером (8 в России)
+    trunk: str = ""
+    # названия страны в анкете (в т.ч. варианты), которым принадлежит код
+    countries: tuple[str, ...] = ()
+
+
+def _rule(code: str, lengths, trunk: str = "", countries=()) -> CountryRule:
+    if isinstance(lengths, int):
+        lengths = (lengths,)
+    return CountryRule(code, frozenset(lengths), trunk, tuple(countries))
+
+
+# Страны, из которых реально приходят гости; при необходимости дополнять
+RULES = (
+    _rule("7", 10, "8", ("Россия", "Казахстан", "Абхазия", "Крым")),
+    _rule("375", 9, "80", ("Беларусь", "Белоруссия")),
+    _rule("380", 9, "0", ("Украина",)),
+    _rule("373", 8, "0", ("Молдова", "Молдавия")),
+    _rule("374", 8, "0", ("Армения",)),
+    _rule("994", 9, "0", ("Азербайджан",)),
+    _rule("995", 9, "0", ("Грузия",)),
+    _rule("996", 9, "0", ("Киргизия", "Кыргызстан")),
+    _rule("992", 9, "", ("Таджикистан",)),
+    _rule("993", 8, "8", ("Туркменистан", "Туркмения")),
+    _rule("998", 9, "", ("Узбекистан",)),
+    _rule("976", 8, "", ("Монголия",)),
+    _rule("370", 8, "8", ("Литва",)),
+    _rule("371", 8, "", ("Латвия",)),
+    _rule("372", (7, 8), "", ("Эстония",)),
+    _rule("358", range(5, 13), "0", ("Финляндия",)),
+    _rule("48", 9, "", ("Польша",)),
+    _rule("49", range(6, 14), "0", ("Германия",)),
+    _rule("33", 9, "0", ("Франция",)),
+    _rule("34", 9, "", ("Испания",)),
+    _rule("39", range(6, 12), "", ("Италия",)),
+    _rule("30", 10, "", ("Греция",)),
+    _rule("357", 8, "", ("Кипр",)),
+    _rule("381", (8, 9), "0", ("Сербия",)),
+    _rule("382", 8, "0", ("Черногория",)),
+    _rule("44", 10, "0", ("Великобритания",)),
+    _rule("1", 10, "", ("США", "Канада")),
+    _rule("90", 10, "0", ("Турция",)),
+    _rule("972", (8, 9), "0", ("Израиль",)),
+    _rule("971", (8, 9), "0", ("ОАЭ",)),
+    _rule("20", (9, 10), "0", ("Египет",)),
+    _rule("66", (8, 9), "0", ("Таиланд",)),
+    _rule("84", (9, 10), "0", ("Вьетнам",)),
+    _rule("62", range(9, 13), "0", ("Индонезия",)),
+    _rule("86", 11, "0", ("Китай",)),
+    _rule("91", 10, "0", ("Индия",)),
+)
+
+# Страна из анкеты -> код, которым дополняется номер без кода
+COUNTRY_CODES = {country: rule.code for rule in RULES for country in rule.countries}
+
+# Код для номеров, введённых без анкеты (/check, старые записи базы)
+DEFAULT_CODE = "7"
+
+# Международный выход вместо «+»: 00 и советское 810
+_INTL_PREFIXES = ("00", "810")
+
+# Префиксное дерево кодов: цифра -> узел; правило узла лежит под ключом None
+_TRIE: dict = {}
+_RULES_BY_CODE: dict[str, CountryRule] = {}
+
+
+def _build() -> None:
+    for rule in RULES:
+        node = _TRIE
+        for digit in rule.code:
+            node = node.setdefault(digit, {})
+        node[None] = rule
+        _RULES_BY_CODE[rule.code] = rule
+
+
+_build()
+
+
+def match_code(digits: str) -> CountryRule | None:
+    """Правило для самого длинного кода страны в начале ``digits``.
+
+    Коды E.164 — префиксный код (ни один не начинается с другого), так что
+    первое найденное правило и есть ответ.
+    """
+    node = _TRIE
+    for digit in digits[:3]:
+        node = node.get(digit)
+        if node is None:
+            return None
+        rule = node.get(None)
+        if rule is not None:
+            return rule
+    return None
+
+
+def _international(digits: str) -> str | None:
+    rule = match_code(digits)
+    if rule is None:
+        return None
+    national = digits[len(rule.code):]
+    if len(national) in rule.lengths:
+        return f"+{rule.code}{national}"
+    return None
+
+
+def _national(digits: str, code: str) -> str | None:
+    rule = _RULES_BY_CODE.get(code)
+    if rule is None:
+        return None
+    if rule.trunk and digits.startswith(rule.trunk):
+        trimmed = digits[len(rule.trunk):]
+        if len(trimmed) in rule.lengths:
+            return f"+{code}{trimmed}"
+    if len(digits) in rule.lengths:
+        return f"+{code}{digits}"
+    return None
+
+
+def to_e164(raw: str, default_code: str | None = DEFAULT_CODE) -> str | None:
+    """Номер в свободной форме -> "+<код><номер>" или None, если номер
+    не подходит ни под одно правило.
+
+    "+7 (978) 123-45-67", "8 978 123 45 67", "79781234567" и "9781234567"
+    дают один и тот же ключ "+79781234567"; номер без кода страны
+    дополняется ``default_code``. Если ``default_code`` равен None (страна
+    неизвестна), принимается только номер с «+», 00 или 810.
+    """
+    raw = raw.strip()
+    digits = _NON_DIGITS.sub("", raw)
+    if not digits:
+        return None
+    if raw.startswith("+"):
+        return _international(digits)
+    for prefix in _INTL_PREFIXES:
+        if digits.startswith(prefix):
+            found = _international(digits[len(prefix):])
+            if found:
+                return found
+    if default_code is None:
+        return None
+    return _national(digits, default_code) or _international(digits)
+
+
+def code_for_country(country: str | None) -> str | None:
+    """Код страны из анкеты; None — страны нет в RULES (и «Другая страна»)."""
+    return COUNTRY_CODES.get((country or "").strip())
+
+
+def phone_prefix(raw: str, default_code: str | None = DEFAULT_CODE) -> str:
+    """Начало номера (для поиска по мере набора) -> начало E.164 без «+».
+
+    «+», 00 и 810 отбрасываются, префикс междугородней связи заменяется
+    кодом страны по умолчанию, а полный национальный номер без кода
+    дополняется им.
+    """
+    raw = raw.strip()
+    digits = _NON_DIGITS.sub("", raw)
+    if raw.startswith("+"):
+        return digits
+    for prefix in _INTL_PREFIXES:
+        if digits.startswith(prefix):
+            return digits[len(prefix):]
+    rule = _RULES_BY_CODE.get(default_code)
+    if rule is None:
+        return digits
+    if rule.trunk and digits.startswith(rule.trunk):
+        return default_code + digits[len(rule.trunk):]
+    if len(digits) in rule.lengths and match_code(digits) is None:
+        return default_code + digits
+    return digits
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm_sessions (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_fsm_sessions_updated_at ON fsm_sessions (updated_at);
+"""
+
+
+def _dump_key(key: StorageKey) -> str:
+    return json.dumps(
+        [
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            key.business_connection_id,
+            key.destiny,
+        ]
+    )
+
+
+def _load_key(raw: str) -> StorageKey:
+    bot_id, chat_id, user_id, thread_id, business_connection_id, destiny = json.loads(raw)
+    return StorageKey(
+        bot_id=bot_id,
+        chat_id=chat_id,
+        user_id=user_id,
+        thread_id=thread_id,
+        business_connection_id=business_connection_id,
+        destiny=destiny,
+    )
+
+
+class _Record:
+    __slots__ = ("state", "data", "touched")
+
+    def __init__(
+        self,
+        state: str | None = None,
+        data: dict | None = None,
+        touched: float = 0.0,
+    ):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.touched = touched
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище: данные в памяти, копия на диске в SQLite.
+
+    Чтение и запись идут в dict, как у ``MemoryStorage``; изменённые ключи
+    раз в ``flush_interval`` секунд одной транзакцией сбрасываются на диск,
+    поэтому несколько ``update_data`` подряд дают одну запись. Сессии,
+    которых не трогали дольше ``ttl`` секунд, удаляются из памяти и базы.
+
+    ``shard=(номер, всего)`` — для воркеров webhook: процесс поднимает с
+    диска только сессии своих пользователей (как их делит update_shard_key),
+    а не копию всей таблицы.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        flush_interval: float = 0.5,
+        ttl: float = 7 * 24 * 3600,
+        shard: tuple[int, int] | None = None,
+    ):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.shard = shard
+        self._records: dict[StorageKey, _Record] = {}
+        self._dirty: set[StorageKey] = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="fsm-storage"
+        )
+        self._conn: sqlite3.Connection | None = None
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+        self._last_sweep = 0.0
+        # грубые часы: обновляются при каждом сбросе, точность TTL не страдает
+        self._clock = time.time()
+
+    # --- работа с базой (в потоке хранилища) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _load_sync(self, min_updated_at: float) -> list[tuple]:
+        conn = self._connect()
+        conn.execute("DELETE FROM fsm_sessions WHERE updated_at < ?", (min_updated_at,))
+        return conn.execute(
+            "SELECT key, state, data, updated_at FROM fsm_sessions"
+        ).fetchall()
+
+    def _write_sync(self, upserts: list[tuple], deletes: list[tuple]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if upserts:
+                conn.executemany(
+                    "INSERT INTO fsm_sessions (key, state, data, updated_at)"
+                    " VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET state = excluded.state,"
+                    " data = excluded.data, updated_at = excluded.updated_at",
+                    upserts,
+                )
+            if deletes:
+                # сессию, которую после нас сохранил другой процесс, не трогаем
+                conn.executemany(
+                    "DELETE FROM fsm_sessions WHERE key = ? AND updated_at <= ?",
+                    deletes,
+                )
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    # --- память ---
+
+    async def _ensure_loaded(self) -> None:
+        """Один раз поднимаем живые сессии с диска и запускаем сброс."""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            rows = await self._run(self._load_sync, time.time() - self.ttl)
+            restored = 0
+            for raw_key, state, data, updated_at in rows:
+                key = _load_key(raw_key)
+                if self._owns(key):
+                    self._records[key] = _Record(state, json.loads(data), updated_at)
+                    restored += 1
+            self._flusher = asyncio.create_task(self._flush_loop(), name="fsm-flush")
+            self._loaded = True
+            if restored:
+                logger.info("Восстановлено FSM-сессий: %s", restored)
+
+    def _owns(self, key: StorageKey) -> bool:
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        # апдейты пользователя приходят в воркер user_id % count
+        return key.user_id % count == index
+
+    async def _record(self, key: StorageKey) -> _Record:
+        if not self._loaded:
+            await self._ensure_loaded()
+        record = self._records.get(key)
+        if record is None:
+            record = self._records[key] = _Record()
+        record.touched = self._clock
+        return record
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Не удалось сохранить FSM-сессии")
+
+    def _sweep(self, now: float) -> None:
+        """Очищаем брошенные сессии (из памяти и с диска их удалит flush)."""
+        deadline = now - self.ttl
+        for key, record in self._records.items():
+            if record.touched < deadline:
+                record.state = None
+                record.data = {}
+                self._dirty.add(key)
+
+    async def flush(self) -> None:
+        """Сбрасываем все накопленные изменения одной транзакцией."""
+        now = self._clock = time.time()
+        if now - self._last_sweep >= min(self.ttl, 60.0):
+            self._last_sweep = now
+            self._sweep(now)
+        if not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, set()
+        upserts, deletes, emptied = [], [], []
+        for key in dirty:
+            record = self._records.get(key)
+            if record is None:
+                continue
+            if record.state is None and not record.data:
+                deletes.append((_dump_key(key), record.touched))
+                emptied.append((key, record))
+            else:
+                # сериализуем в event loop, чтобы не гоняться с хендлерами
+                upserts.append(
+                    (
+                        _dump_key(key),
+                        record.state,
+                        json.dumps(record.data, ensure_ascii=False),
+                        record.touched,
+                    )
+                )
+        try:
+            await self._run(self._write_sync, upserts, deletes)
+        except BaseException:
+            self._dirty |= dirty
+            raise
+        # пустые сессии забываем, если за время записи их не заполнили
+        for key, record in emptied:
+            if self._records.get(key) is record and record.state is None and not record.data:
+                del self._records[key]
+
+    # --- интерфейс BaseStorage ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._dirty.add(key)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = await self._record(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        record = await self._record(key)
+        record.data = data.copy()
+        self._dirty.add(key)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = await self._record(key)
+        return record.data.copy()
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        if self._loaded:
+            await self.flush()
+        await self._run(self._close_sync)
+        self._executor.shutdown(wait=True)
@@ -1,32 +1,210 @@
+import asyncio
+import logging
+import secrets
 from html import escape
-from datetime import datetime
+from datetime import datetime, timedelta
+from pathlib import Path
 
 from aiogram import Router, F, Bot
 from aiogram.types import (
     Message,
     CallbackQuery,
-    InputMediaPhoto,
     ReplyKeyboardRemove,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultsButton,
+    InputTextMessageContent,
 )
 from aiogram.filters import CommandStart, Command
 from aiogram.enums import ChatMemberStatus
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from .config import CHANNEL_USERNAME, ADMIN_IDS
+from .config import (
+    BOT_TOKEN,
+    ENV_FILE,
+    PROCESS_ENV,
+    CONFIG_WATCH_INTERVAL,
+    TENANTS_FILE,
+    SUBSCRIPTION_TTL,
+    SUBSCRIPTION_NEGATIVE_TTL,
+    SUBSCRIPTION_CACHE_SIZE,
+    REPORTS_DB,
+    SEND_RATE_GLOBAL,
+    SEND_RATE_PER_CHAT,
+    OUTBOX_WORKERS,
+    OUTBOX_MAX_QUEUE,
+    OUTBOX_MAX_FLOOD_WAIT,
+    WORKER_PROCESSES,
+    INDEX_SYNC_INTERVAL,
+    MEDIA_GROUP_WINDOW,
+    PHOTO_HASHING,
+    PHOTO_HASH_DISTANCE,
+    PHOTO_HASH_TIMEOUT,
+    INLINE_CACHE_SIZE,
+    INLINE_PAGE_SIZE,
+    PENDING_EXPIRE_AFTER,
+    PENDING_REMIND_AFTER,
+    PENDING_DIGEST_INTERVAL,
+    THROTTLE_CALLBACK_RATE,
+    THROTTLE_CALLBACK_BURST,
+    THROTTLE_TEXT_RATE,
+    THROTTLE_TEXT_BURST,
+    THROTTLE_PHOTO_RATE,
+    THROTTLE_PHOTO_BURST,
+    THROTTLE_MAX_USERS,
+)
 from .states import ReportGuest
 from .keyboards import start_keyboard, countries_keyboard, photos_keyboard
-from .countries import load_countries, save_countries
+from .countries import default_countries
+from .subscription import SubscriptionCache
+from .reports import (
+    ReportStore,
+    STATUS_PENDING,
+    STATUS_APPROVED,
+    STATUS_PUBLISHED,
+    STATUS_REJECTED,
+)
+from .phone_index import PhoneIndex, phone_key
+from .e164 import to_e164, code_for_country
+from .name_index import NameIndex
+from .inline_search import InlineSearch
+from .stats import render_stats
+from .settings import (
+    LiveSettings,
+    Settings,
+    read_settings,
+    reload_on_sighup,
+    stop_reload_on_sighup,
+)
+from .tenants import Tenant, TenantRegistry, load_tenants
+from .lifecycle import PendingLifecycle
+from .throttling import (
+    ThrottlingMiddleware,
+    KIND_CALLBACK,
+    KIND_TEXT,
+    KIND_PHOTO,
+)
+from .ratelimit import SendRateLimiter
+from .outbox import Outbox, PRIORITY_CHANNEL, PRIORITY_ADMIN, PRIORITY_NOTIFY
+from .albums import MediaGroupCollector
+from .photo_hash import PhotoHashIndex, to_signed
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 MAX_PHOTOS = 10
 
-# Память для заявок на модерацию: id -> словарь с данными
-pending_reports: dict[str, dict] = {}
+# Все заявки (и ожидающие модерации, и обработанные) хранятся в SQLite
+report_store = ReportStore(REPORTS_DB)
+
+# Индексы опубликованных кейсов по телефону и ФИО (строятся при старте
+# и догоняют публикации других процессов, см. sync_indexes)
+phone_index = PhoneIndex()
+name_index = NameIndex()
+# Inline-поиск по началу номера или ФИО
+inline_search = InlineSearch(cache_size=INLINE_CACHE_SIZE)
+last_published_event = 0
+
+# Перцептивные хэши фото из всех заявок (поиск повторно присланных фото)
+photo_index = PhotoHashIndex(max_distance=PHOTO_HASH_DISTANCE)
+last_photo_hash = 0
+
+# Лимиты Telegram на исходящие сообщения (общий и на каждый чат);
+# общий лимит бота делим между процессами
+send_limiter = SendRateLimiter(
+    global_rate=SEND_RATE_GLOBAL / WORKER_PROCESSES,
+    per_chat_rate=SEND_RATE_PER_CHAT,
+)
 
+# Очередь всех исходящих отправок (канал, админы, уведомления)
+outbox = Outbox(
+    report_store,
+    send_limiter,
+    workers=OUTBOX_WORKERS,
+    max_queue=OUTBOX_MAX_QUEUE,
+    max_flood_wait=OUTBOX_MAX_FLOOD_WAIT,
+)
 
-async def check_subscription(bot: Bot, user_id: int) -> bool:
-    member = await bot.get_chat_member(CHANNEL_USERNAME, user_id)
+# Сборка альбомов: одно обновление состояния и один ответ на альбом
+media_groups = MediaGroupCollector(window=MEDIA_GROUP_WINDOW)
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+background_tasks: set[asyncio.Task] = set()
+# Периодическая подгрузка чужих публикаций и импорта (см. sync_indexes)
+index_sync_task: asyncio.Task | None = None
+
+# Лимиты частоты апдейтов от одного пользователя (ставится на диспетчер
+# в run.py, перед FSM-хранилищем)
+throttling = ThrottlingMiddleware(
+    {
+        KIND_CALLBACK: (THROTTLE_CALLBACK_RATE, THROTTLE_CALLBACK_BURST),
+        KIND_TEXT: (THROTTLE_TEXT_RATE, THROTTLE_TEXT_BURST),
+        KIND_PHOTO: (THROTTLE_PHOTO_RATE, THROTTLE_PHOTO_BURST),
+    },
+    max_users=THROTTLE_MAX_USERS,
+)
+
+# Кэш проверок подписки, чтобы не дёргать get_chat_member на каждый клик
+subscription_cache = SubscriptionCache(
+    positive_ttl=SUBSCRIPTION_TTL,
+    negative_ttl=SUBSCRIPTION_NEGATIVE_TTL,
+    max_size=SUBSCRIPTION_CACHE_SIZE,
+)
+
+# Боты процесса: у каждого свой канал, админы и список стран (без
+# TENANTS_FILE — один бот из .env). Канал и админы — неизменяемый снимок,
+# перечитывается по SIGHUP и при изменении файла; хендлеры читают
+# tenant.settings.current без блокировок
+if TENANTS_FILE:
+    tenants = TenantRegistry(load_tenants(Path(TENANTS_FILE), CONFIG_WATCH_INTERVAL))
+else:
+    tenants = TenantRegistry([
+        Tenant(
+            "default",
+            BOT_TOKEN,
+            LiveSettings(
+                lambda: read_settings(ENV_FILE, PROCESS_ENV),
+                path=ENV_FILE,
+                watch_interval=CONFIG_WATCH_INTERVAL,
+            ),
+            default_countries,
+        )
+    ])
+
+
+def settings_for(bot_id: int | None) -> Settings:
+    return tenants.get(bot_id).settings.current
+
+
+def is_admin(bot_id: int | None, user_id: int) -> bool:
+    return user_id in settings_for(bot_id).admin_ids
+
+
+def current_channel(bot_id: int | None) -> str:
+    return settings_for(bot_id).channel_username
+
+
+def report_bot_id(report: dict) -> int | None:
+    """Бот, через который идёт всё, что касается заявки."""
+    return tenants.get(report.get("bot_id")).bot_id
+
+
+def apply_settings(old: Settings, new: Settings) -> None:
+    if old.channel_username != new.channel_username:
+        # подписка на старый канал ничего не значит
+        subscription_cache.clear()
+
+
+# Админ одного бота не освобождается от лимитов на другом; настройки
+# читаются на каждом апдейте, так что перечитывание подхватывается сразу
+throttling.exempt = is_admin
+for _tenant in tenants:
+    _tenant.settings.on_reload(apply_settings)
+
+
+async def fetch_subscription(bot: Bot, user_id: int) -> bool:
+    member = await bot.get_chat_member(current_channel(bot.id), user_id)
     return member.status in {
         ChatMemberStatus.MEMBER,
         ChatMemberStatus.ADMINISTRATOR,
@@ -34,6 +212,13 @@ async def check_subscription(bot: Bot, user_id: int) -> bool:
     }
 
 
+async def check_subscription(bot: Bot, user_id: int) -> bool:
+    # у каждого бота свой канал, поэтому ключ — пара (бот, пользователь)
+    return await subscription_cache.check(
+        (bot.id, user_id), lambda: fetch_subscription(bot, user_id)
+    )
+
+
 def build_post_text(
     country: str,
     city: str,
@@ -60,6 +245,22 @@ def build_post_text(
     return f"{title}\n\n{meta}\n\n{body}"
 
 
+def repeat_offender_text(phone: str, guest_name: str) -> str:
+    """Блок для модератора о прошлых кейсах с этим номером и похожим ФИО."""
+    prior = phone_index.count(phone)
+    if not prior:
+        text = "Ранее кейсов с этим номером не было.\n"
+    else:
+        text = f"⚠️ <b>Ранее опубликовано кейсов с этим номером: {prior}</b>\n"
+
+    similar = name_index.search(guest_name, k=5)
+    if similar:
+        text += "⚠️ <b>Похожие ФИО в базе:</b>\n"
+        for score, report_id, name in similar:
+            text += f"• {escape(name)} — #{report_id} ({score:.0%})\n"
+    return text
+
+
 def moderation_keyboard(report_id: str):
     kb = InlineKeyboardBuilder()
     kb.button(text="✅ Опубликовать", callback_data=f"mod_approve:{report_id}")
@@ -92,8 +293,12 @@ async def queue_report_for_moderation(
         description=description,
     )
 
-    # id заявки: userId_timestamp
-    report_id = f"{message.from_user.id}_{int(datetime.now().timestamp())}"
+    # id заявки: userId_timestamp(мс)_случайный суффикс — две заявки
+    # одного пользователя в одну секунду не совпадут
+    report_id = (
+        f"{message.from_user.id}_{int(datetime.now().timestamp() * 1000)}"
+        f"_{secrets.token_hex(2)}"
+    )
 
     report = {
         "id": report_id,
@@ -106,10 +311,13 @@ async def queue_report_for_moderation(
         "phone": phone,
         "description": description,
         "photo_ids": photo_ids if with_photos else [],
+        "status": STATUS_PENDING,
         "created_at": datetime.now().isoformat(),
+        "bot_id": bot.id,
     }
 
-    pending_reports[report_id] = report
+    await report_store.add(report)
+    pending_lifecycle.track(report_id, report["created_at"])
 
     # Уведомляем пользователя
     await message.answer(
@@ -119,57 +327,168 @@ async def queue_report_for_moderation(
     )
 
     # Сбрасываем состояния и возвращаем на старт
+    channel = current_channel(bot.id)
     await state.clear()
     await message.answer(
-        f"Чтобы добавить нежелательного гостя, вы должны быть подписаны на канал {CHANNEL_USERNAME}",
+        f"Чтобы добавить нежелательного гостя, вы должны быть подписаны на канал {channel}",
         reply_markup=start_keyboard(),
     )
 
-    # Отправляем заявку всем админам
-    admins = ADMIN_IDS or []
+    # Отправляем заявку всем админам в фоне: пользователь не ждёт рассылку
     sender_username = (
         f"@{message.from_user.username}" if message.from_user.username else "без никнейма"
     )
+    repeat_text = repeat_offender_text(phone, guest_name)
+
+    if report["photo_ids"]:
+        # 1) если есть фото — сначала медиа-группа с полным текстом
+        control_text = (
+            f"Новая заявка <b>#{report_id}</b> на публикацию в {channel}\n\n"
+            f"Отправитель: {sender_username} (ID: <code>{message.from_user.id}</code>)\n\n"
+            f"{repeat_text}"
+            f"Фото: {len(report['photo_ids'])} шт.\n"
+        )
+    else:
+        # 2) если фото нет — всё в одном тексте
+        control_text = (
+            f"Новая заявка <b>#{report_id}</b> на публикацию в {channel}\n\n"
+            f"Отправитель: {sender_username} (ID: <code>{message.from_user.id}</code>)\n\n"
+            f"{repeat_text}\n"
+            f"{post_text}"
+        )
+
+    task = asyncio.create_task(fan_out_to_admins(bot, report, post_text, control_text))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def send_report_to_admin(
+    admin_id: int,
+    report: dict,
+    post_text: str,
+    control_text: str,
+) -> None:
+    """Отправляем одному админу медиа-группу (если есть) и сообщение с кнопками."""
+    bot_id = report_bot_id(report)
+    if report["photo_ids"]:
+        # Кнопки должны прийти после альбома, поэтому их задание ставит
+        # on_admin_album_sent, когда альбом доставлен. Сообщение с кнопками
+        # лежит в теге альбома и вместе с ним переживает перезапуск.
+        control = {
+            "chat_id": admin_id,
+            "text": control_text,
+            "reply_markup": moderation_keyboard(report["id"]).model_dump(
+                mode="json", exclude_none=True
+            ),
+        }
+        if bot_id is not None:
+            control["bot_id"] = bot_id
+        sent = await outbox.send_media_group(
+            admin_id,
+            report["photo_ids"],
+            caption=post_text,
+            priority=PRIORITY_ADMIN,
+            tag={"event": "admin_album", "report_id": report["id"], "control": control},
+            bot_id=bot_id,
+        )
+        await sent
+        return
+
+    # Сообщение с кнопками модерации (всегда отдельное); его message_id
+    # запоминает on_admin_copy_sent, чтобы после решения убрать кнопки
+    sent = await outbox.send_message(
+        admin_id,
+        control_text,
+        reply_markup=moderation_keyboard(report["id"]),
+        priority=PRIORITY_ADMIN,
+        tag={"event": "admin_copy", "report_id": report["id"]},
+        bot_id=bot_id,
+    )
+    await sent
+
+
+async def check_photo_duplicates(bot: Bot, report: dict) -> str:
+    """Хэшируем фото заявки и ищем похожие в прошлых заявках.
+
+    Возвращает блок для сообщения модератору (пустой, если совпадений нет).
+    """
+    photo_ids = report["photo_ids"]
+
+    async def hash_photo(file_id: str) -> int:
+        # в photo_ids уже лежит самый большой PhotoSize
+        data = await bot.download(file_id)
+        return await photo_index.hash_bytes(data.getvalue())
+
+    hashes = await asyncio.gather(*(hash_photo(pid) for pid in photo_ids))
+
+    lines = []
+    for n, (file_id, value) in enumerate(zip(photo_ids, hashes), start=1):
+        for distance, other_report, _ in photo_index.find_similar(
+            value, exclude_report=report["id"]
+        )[:3]:
+            lines.append(
+                f"• фото {n} похоже на фото из заявки #{other_report} "
+                f"(отличий: {distance} из 64)"
+            )
+        photo_index.add(value, report["id"], file_id)
+
+    await report_store.add_photo_hashes(
+        [(report["id"], pid, to_signed(value)) for pid, value in zip(photo_ids, hashes)]
+    )
+    if not lines:
+        return ""
+    return "\n⚠️ <b>Похожие фото в других заявках:</b>\n" + "\n".join(lines) + "\n"
+
 
-    for admin_id in admins:
+async def fan_out_to_admins(
+    bot: Bot,
+    report: dict,
+    post_text: str,
+    control_text: str,
+) -> None:
+    """Параллельно рассылаем заявку всем админам и пишем итог в историю."""
+    if PHOTO_HASHING and photo_index.available and report["photo_ids"]:
         try:
-            # 1) если есть фото — сначала медиа-группа с полным текстом
-            if report["photo_ids"]:
-                media = []
-                for i, pid in enumerate(report["photo_ids"]):
-                    if i == 0:
-                        # первая фотка с подписью (весь текст поста)
-                        media.append(InputMediaPhoto(media=pid, caption=post_text))
-                    else:
-                        media.append(InputMediaPhoto(media=pid))
-                await bot.send_media_group(chat_id=admin_id, media=media)
-
-                control_text = (
-                    f"Новая заявка <b>#{report_id}</b> на публикацию в {CHANNEL_USERNAME}\n\n"
-                    f"Отправитель: {sender_username} (ID: <code>{message.from_user.id}</code>)\n\n"
-                    f"Фото: {len(report['photo_ids'])} шт.\n"
-                )
-            else:
-                # 2) если фото нет — всё в одном тексте
-                control_text = (
-                    f"Новая заявка <b>#{report_id}</b> на публикацию в {CHANNEL_USERNAME}\n\n"
-                    f"Отправитель: {sender_username} (ID: <code>{message.from_user.id}</code>)\n\n"
-                    f"{post_text}"
-                )
-
-            # Сообщение с кнопками модерации (всегда отдельное)
-            await bot.send_message(
-                admin_id,
-                text=control_text,
-                reply_markup=moderation_keyboard(report_id),
+            control_text += await asyncio.wait_for(
+                check_photo_duplicates(bot, report), PHOTO_HASH_TIMEOUT
             )
         except Exception:
-            # если какому-то админу нельзя написать, просто пропускаем
-            continue
+            logger.exception("Не удалось проверить фото заявки %s", report["id"])
+
+    admins = sorted(settings_for(bot.id).admin_ids)
+    results = await asyncio.gather(
+        *(
+            send_report_to_admin(admin_id, report, post_text, control_text)
+            for admin_id in admins
+        ),
+        return_exceptions=True,
+    )
+
+    for admin_id, result in zip(admins, results):
+        if isinstance(result, Exception):
+            logger.warning(
+                "Не удалось отправить заявку %s админу %s: %r",
+                report["id"],
+                admin_id,
+                result,
+            )
+            await report_store.add_event(
+                report["id"],
+                "delivery_failed",
+                actor_id=admin_id,
+                details={"error": type(result).__name__, "message": str(result)},
+            )
+        else:
+            await report_store.add_event(report["id"], "delivered", actor_id=admin_id)
 
 
-async def publish_report_to_channel(report: dict, bot: Bot):
-    """Публикуем уже одобренный пост в канал."""
+async def publish_report_to_channel(report: dict, actor_id: int | None = None):
+    """Ставим уже одобренный пост в очередь на публикацию в канал.
+
+    Статус ``published`` и индексы обновляются в ``on_outbox_sent``,
+    когда Telegram подтвердит отправку (в том числе после перезапуска).
+    Повторный вызов для той же заявки не создаёт второго задания.
+    """
 
     post_text = build_post_text(
         country=report["country"],
@@ -179,17 +498,221 @@ async def publish_report_to_channel(report: dict, bot: Bot):
         description=report["description"],
     )
     photo_ids: list[str] = report.get("photo_ids") or []
+    tag = {"event": "published", "report_id": report["id"], "actor_id": actor_id}
+    dedup_key = f"publish:{report['id']}"
+    # в канал того бота, через который подана заявка
+    bot_id = report_bot_id(report)
 
     if photo_ids:
-        media = []
-        for i, pid in enumerate(photo_ids):
-            if i == 0:
-                media.append(InputMediaPhoto(media=pid, caption=post_text))
-            else:
-                media.append(InputMediaPhoto(media=pid))
-        await bot.send_media_group(chat_id=CHANNEL_USERNAME, media=media)
+        await outbox.send_media_group(
+            current_channel(bot_id),
+            photo_ids,
+            caption=post_text,
+            priority=PRIORITY_CHANNEL,
+            tag=tag,
+            dedup_key=dedup_key,
+            bot_id=bot_id,
+        )
     else:
-        await bot.send_message(chat_id=CHANNEL_USERNAME, text=post_text)
+        await outbox.send_message(
+            current_channel(bot_id),
+            post_text,
+            priority=PRIORITY_CHANNEL,
+            tag=tag,
+            dedup_key=dedup_key,
+            bot_id=bot_id,
+        )
+
+
+async def should_publish(tag: dict) -> bool:
+    """Перед отправкой в канал: заявка всё ещё ждёт публикации?
+
+    Перед каждой попыткой отправки заявка помечается этим процессом
+    (claim_publish). Если процесс упал после отправки, но до перевода в
+    ``published``, задание подхватит другой владелец, увидит чужую отметку
+    и второй раз пост не отправит — заявку тогда нужно проверить вручную.
+    """
+    if tag.get("event") != "published":
+        return True
+    report_id = tag["report_id"]
+    if await report_store.claim_publish(report_id, outbox.owner):
+        return True
+    report = await report_store.get(report_id)
+    if report is not None and report["status"] == STATUS_APPROVED:
+        logger.warning(
+            "Заявка %s: публикацию начал упавший процесс, пост мог выйти — "
+            "проверьте канал вручную",
+            report_id,
+        )
+        await report_store.add_event(report_id, "publish_uncertain")
+    return False
+
+
+async def on_outbox_failed(tag: dict, error: Exception) -> None:
+    if tag.get("event") == "published":
+        # пост в канал точно не отправлен — его можно будет повторить
+        await report_store.release_publish(tag["report_id"], outbox.owner)
+    elif tag.get("event") == "admin_copy" and "admin_id" in tag:
+        # кнопки после альбома: их доставку fan_out_to_admins не ждёт
+        await report_store.add_event(
+            tag["report_id"],
+            "delivery_failed",
+            actor_id=tag["admin_id"],
+            details={"error": type(error).__name__, "message": str(error)},
+        )
+
+
+async def on_outbox_sent(tag: dict, result) -> None:
+    """Отправка из очереди подтверждена Telegram."""
+    if tag.get("event") != "published":
+        return
+    report = await report_store.transition(
+        tag["report_id"], STATUS_APPROVED, STATUS_PUBLISHED, tag.get("actor_id")
+    )
+    if report:
+        phone_index.add(report["phone"], report["id"])
+        name_index.add(report["id"], report["guest_name"])
+        inline_search.add(report["id"], report["phone"], report["guest_name"])
+        # автору — только когда пост действительно вышел в канал
+        await outbox.send_message(
+            report["user_id"],
+            "Ваш кейс прошёл модерацию и опубликован в канале.",
+            priority=PRIORITY_NOTIFY,
+            dedup_key=f"notify_published:{report['id']}",
+            bot_id=report_bot_id(report),
+            follow_up=True,
+        )
+
+
+def decision_text(report: dict) -> str:
+    """Строка с итогом модерации для копий заявки у админов."""
+    when = (report["decided_at"] or "")[:16].replace("T", " ")
+    if report["status"] in (STATUS_APPROVED, STATUS_PUBLISHED):
+        return f"✅ <b>Одобрено</b> (<code>{report['decided_by']}</code>, {when})"
+    if report["status"] == STATUS_REJECTED:
+        return f"❌ <b>Отклонено</b> (<code>{report['decided_by']}</code>, {when})"
+    return f"⌛ <b>Закрыто без решения</b> ({when})"
+
+
+async def close_admin_copy(
+    copy: dict, outcome: str, bot_id: int | None, follow_up: bool = False
+) -> None:
+    text = f"{copy['text']}\n\n{outcome}"
+    if len(text) > 4096:
+        text = outcome
+    await outbox.edit_message_text(
+        copy["chat_id"],
+        copy["message_id"],
+        text,
+        priority=PRIORITY_ADMIN,
+        dedup_key=f"close:{copy['chat_id']}:{copy['message_id']}",
+        bot_id=bot_id,
+        follow_up=follow_up,
+    )
+
+
+async def close_admin_copies(report: dict) -> None:
+    """После решения убираем кнопки у всех админов и пишем итог.
+
+    Правки идут через outbox, т.е. под общим лимитом отправки.
+    """
+    outcome = decision_text(report)
+    copies = await report_store.admin_messages(report["id"])
+    bot_id = report_bot_id(report)
+    await asyncio.gather(
+        *(close_admin_copy(copy, outcome, bot_id) for copy in copies)
+    )
+
+
+def close_admin_copies_later(report: dict) -> None:
+    task = asyncio.create_task(close_admin_copies(report))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def still_pending(tag: dict) -> bool:
+    """Копию заявки, по которой уже есть решение, админам не шлём."""
+    if tag.get("event") not in ("admin_album", "admin_copy"):
+        return True
+    report = await report_store.get(tag["report_id"])
+    return report is not None and report["status"] == STATUS_PENDING
+
+
+async def on_admin_album_sent(tag: dict, result) -> None:
+    """Альбом у админа — ставим в очередь сообщение с кнопками к нему."""
+    if tag.get("event") != "admin_album" or "control" not in tag:
+        return
+    control = tag["control"]
+    # задание кнопок попадает в журнал раньше, чем из него уйдёт альбом
+    await outbox.submit(
+        "send_message",
+        control,
+        priority=PRIORITY_ADMIN,
+        tag={
+            "event": "admin_copy",
+            "report_id": tag["report_id"],
+            "admin_id": control["chat_id"],
+        },
+        dedup_key=f"admin_copy:{tag['report_id']}:{control['chat_id']}",
+        follow_up=True,
+    )
+
+
+async def on_admin_copy_sent(tag: dict, result) -> None:
+    """Запоминаем message_id копии заявки у админа."""
+    if tag.get("event") != "admin_copy":
+        return
+    report_id = tag["report_id"]
+    await report_store.add_admin_message(
+        report_id, result.chat.id, result.message_id, result.html_text
+    )
+    # решение могли принять, пока эта копия была в очереди
+    report = await report_store.get(report_id)
+    if report is not None and report["status"] != STATUS_PENDING:
+        copy = {
+            "chat_id": result.chat.id,
+            "message_id": result.message_id,
+            "text": result.html_text,
+        }
+        # мы внутри воркера outbox: место в очереди не ждём
+        await close_admin_copy(
+            copy, decision_text(report), report_bot_id(report), follow_up=True
+        )
+
+
+outbox.add_guard(should_publish)
+outbox.add_failure_listener(on_outbox_failed)
+outbox.add_guard(still_pending)
+outbox.add_listener(on_outbox_sent)
+outbox.add_listener(on_admin_album_sent)
+outbox.add_listener(on_admin_copy_sent)
+
+
+async def sync_indexes() -> None:
+    """Добавляем в индексы публикации, которых ещё не видели (в т.ч. чужие)."""
+    global last_published_event, last_photo_hash
+    rows = await report_store.published_after(last_published_event)
+    for event_id, report_id, phone, guest_name in rows:
+        phone_index.add(phone, report_id)
+        name_index.add(report_id, guest_name)
+        last_published_event = event_id
+    if rows:
+        inline_search.bulk_load(row[1:] for row in rows)
+
+    if PHOTO_HASHING:
+        rows = await report_store.photo_hashes(last_photo_hash)
+        photo_index.bulk_load(row[1:] for row in rows)
+        if rows:
+            last_photo_hash = rows[-1][0]
+
+
+async def sync_indexes_forever() -> None:
+    while True:
+        await asyncio.sleep(INDEX_SYNC_INTERVAL)
+        try:
+            await sync_indexes()
+        except Exception:
+            logger.exception("Не удалось обновить индексы")
 
 
 # =========================
@@ -199,10 +722,10 @@ async def publish_report_to_channel(report: dict, bot: Bot):
 
 # /start
 @router.message(CommandStart())
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, bot: Bot):
     text = (
         "Чтобы добавить нежелательного гостя, вы должны быть подписаны "
-        f"на канал {CHANNEL_USERNAME}"
+        f"на канал {current_channel(bot.id)}"
     )
     await message.answer(text, reply_markup=start_keyboard())
 
@@ -214,7 +737,7 @@ async def cb_add_guest(callback: CallbackQuery, state: FSMContext, bot: Bot):
 
     if not await check_subscription(bot, user_id):
         await callback.message.answer(
-            f"Доступ ограничен из-за отсутствия подписки на канал {CHANNEL_USERNAME}"
+            f"Доступ ограничен из-за отсутствия подписки на канал {current_channel(bot.id)}"
         )
         await callback.answer()
         return
@@ -223,7 +746,8 @@ async def cb_add_guest(callback: CallbackQuery, state: FSMContext, bot: Bot):
         'Отлично! Вы успешно подписались на канал "Нежелательные гости"👍'
     )
     await callback.message.answer(
-        "Из какой вы страны?", reply_markup=countries_keyboard()
+        "Из какой вы страны?",
+        reply_markup=countries_keyboard(tenants.get(bot.id).countries),
     )
     await state.set_state(ReportGuest.country)
     await callback.answer()
@@ -278,25 +802,33 @@ async def get_city(message: Message, state: FSMContext):
 async def get_guest_name(message: Message, state: FSMContext):
     await state.update_data(guest_name=message.text.strip())
     await message.answer("Записал!")
-    await message.answer(
-        "Напишите номер телефона нежелательного гостя без плюса, пробелов, "
-        "дефисов и скобок. Пример: 79781234567"
-    )
+    data = await state.get_data()
+    if code_for_country(data.get("country")) is None:
+        # код страны угадать не по чему — номер только в международном виде
+        await message.answer(
+            "Напишите номер телефона нежелательного гостя с кодом страны "
+            "через + или 00. Пример: +381 64 123-45-67"
+        )
+    else:
+        await message.answer(
+            "Напишите номер телефона нежелательного гостя, лучше с кодом страны. "
+            "Пробелы, дефисы и скобки не мешают. Пример: +7 978 123-45-67"
+        )
     await state.set_state(ReportGuest.phone)
 
 
-def valid_phone(phone: str) -> bool:
-    return phone.isdigit() and len(phone) == 11 and phone.startswith("7")
-
-
 # Телефон
 @router.message(ReportGuest.phone)
 async def get_phone(message: Message, state: FSMContext):
-    phone = message.text.strip()
-    if not valid_phone(phone):
+    # номер без кода страны дополняем кодом страны из анкеты
+    data = await state.get_data()
+    code = code_for_country(data.get("country"))
+    phone = to_e164(message.text or "", code)
+    if phone is None:
         await message.answer(
             "Похоже, номер указан некорректно.\n"
-            "Пожалуйста, введите номер в формате 79781234567"
+            "Пожалуйста, введите номер с кодом страны, например "
+            + ("+381641234567 или 00381641234567" if code is None else "+79781234567")
         )
         return
 
@@ -331,13 +863,17 @@ async def get_description(message: Message, state: FSMContext):
     await state.set_state(ReportGuest.photos)
 
 
-# Приём фото
-@router.message(ReportGuest.photos, F.photo)
-async def collect_photos(message: Message, state: FSMContext):
+async def commit_photos(message: Message, state: FSMContext, file_ids: list[str]):
+    """Добавляем фото в заявку одним обновлением и отвечаем один раз.
+
+    Вызывается под замком пользователя, поэтому лимит MAX_PHOTOS
+    соблюдается и при параллельных сообщениях.
+    """
     data = await state.get_data()
-    photo_ids: list[str] = data.get("photo_ids", [])
+    photo_ids: list[str] = list(data.get("photo_ids", []))
 
-    if len(photo_ids) >= MAX_PHOTOS:
+    free = MAX_PHOTOS - len(photo_ids)
+    if free <= 0:
         await message.answer(
             f"Можно загрузить не более {MAX_PHOTOS} фото. "
             "Нажмите «Подтвердить» или «Пропустить».",
@@ -345,26 +881,67 @@ async def collect_photos(message: Message, state: FSMContext):
         )
         return
 
-    file_id = message.photo[-1].file_id
-    photo_ids.append(file_id)
+    accepted = file_ids[:free]
+    photo_ids.extend(accepted)
     await state.update_data(photo_ids=photo_ids)
 
-    await message.answer(
-        f"Фото добавлено ({len(photo_ids)}/{MAX_PHOTOS}).",
-        reply_markup=photos_keyboard(),
-    )
+    if len(accepted) < len(file_ids):
+        text = (
+            f"Добавлено фото: {len(accepted)} ({len(photo_ids)}/{MAX_PHOTOS}). "
+            f"Остальные не поместились — можно не более {MAX_PHOTOS} фото."
+        )
+    elif len(accepted) > 1:
+        text = f"Добавлено фото: {len(accepted)} ({len(photo_ids)}/{MAX_PHOTOS})."
+    else:
+        text = f"Фото добавлено ({len(photo_ids)}/{MAX_PHOTOS})."
+    await message.answer(text, reply_markup=photos_keyboard())
+
+
+# Приём фото
+@router.message(ReportGuest.photos, F.photo)
+async def collect_photos(message: Message, state: FSMContext):
+    user_id = message.from_user.id
+    file_id = message.photo[-1].file_id
+
+    # Альбом: копим сообщения и сохраняем их одной пачкой
+    if message.media_group_id:
+        media_groups.add(
+            user_id,
+            message.media_group_id,
+            file_id,
+            lambda file_ids: commit_photos(message, state, file_ids),
+        )
+        return
+
+    async with media_groups.lock(user_id):
+        await commit_photos(message, state, [file_id])
+
+
+async def submit_report_once(
+    message: Message, state: FSMContext, bot: Bot, with_photos: bool
+) -> None:
+    """Изоляция FSM выключена, поэтому два нажатия подряд обрабатываются
+    параллельно; под замком пользователя заявку создаёт только первое,
+    второе видит, что анкета уже сброшена."""
+    async with media_groups.lock(message.from_user.id):
+        if await state.get_state() != ReportGuest.photos.state:
+            return
+        await queue_report_for_moderation(message, state, bot, with_photos)
 
 
 # Нажали «Пропустить» — отправляем на модерацию без фото
 @router.message(ReportGuest.photos, F.text == "Пропустить")
 async def msg_skip_photos(message: Message, state: FSMContext, bot: Bot):
-    await queue_report_for_moderation(message, state, bot, with_photos=False)
+    await media_groups.drain(message.from_user.id)
+    await submit_report_once(message, state, bot, with_photos=False)
 
 
 # Нажали «Подтвердить» — отправляем на модерацию с фото (если есть)
 @router.message(ReportGuest.photos, F.text == "Подтвердить")
 async def msg_confirm_photos(message: Message, state: FSMContext, bot: Bot):
-    await queue_report_for_moderation(message, state, bot, with_photos=True)
+    # дожидаемся альбомов, которые ещё собираются
+    await media_groups.drain(message.from_user.id)
+    await submit_report_once(message, state, bot, with_photos=True)
 
 
 # =========================
@@ -374,12 +951,14 @@ async def msg_confirm_photos(message: Message, state: FSMContext, bot: Bot):
 
 @router.callback_query(F.data.startswith("mod_approve:"))
 async def cb_mod_approve(callback: CallbackQuery, bot: Bot):
-    if callback.from_user.id not in ADMIN_IDS:
+    if not is_admin(bot.id, callback.from_user.id):
         await callback.answer("У вас нет прав для модерации.", show_alert=True)
         return
 
     report_id = callback.data.split(":", 1)[1]
-    report = pending_reports.pop(report_id, None)
+    report = await report_store.transition(
+        report_id, STATUS_PENDING, STATUS_APPROVED, callback.from_user.id
+    )
 
     if not report:
         await callback.answer(
@@ -388,17 +967,9 @@ async def cb_mod_approve(callback: CallbackQuery, bot: Bot):
         )
         return
 
-    await publish_report_to_channel(report, bot)
-
-    # Уведомляем пользователя
-    user_id = report["user_id"]
-    try:
-        await bot.send_message(
-            user_id,
-            "Ваш кейс прошёл модерацию и опубликован в канале.",
-        )
-    except Exception:
-        pass
+    await publish_report_to_channel(report, callback.from_user.id)
+    # автора уведомит on_outbox_sent, когда Telegram подтвердит публикацию
+    close_admin_copies_later(report)
 
     await callback.message.answer(f"Заявка #{report_id} опубликована.")
     await callback.answer("Опубликовано", show_alert=False)
@@ -406,12 +977,14 @@ async def cb_mod_approve(callback: CallbackQuery, bot: Bot):
 
 @router.callback_query(F.data.startswith("mod_reject:"))
 async def cb_mod_reject(callback: CallbackQuery, bot: Bot):
-    if callback.from_user.id not in ADMIN_IDS:
+    if not is_admin(bot.id, callback.from_user.id):
         await callback.answer("У вас нет прав для модерации.", show_alert=True)
         return
 
     report_id = callback.data.split(":", 1)[1]
-    report = pending_reports.pop(report_id, None)
+    report = await report_store.transition(
+        report_id, STATUS_PENDING, STATUS_REJECTED, callback.from_user.id
+    )
 
     if not report:
         await callback.answer(
@@ -420,64 +993,297 @@ async def cb_mod_reject(callback: CallbackQuery, bot: Bot):
         )
         return
 
+    close_admin_copies_later(report)
+
     # Уведомляем пользователя об отказе
-    user_id = report["user_id"]
-    try:
-        await bot.send_message(
-            user_id,
-            "Ваш кейс был отклонён модератором и не был опубликован в канале.",
-        )
-    except Exception:
-        pass
+    await outbox.send_message(
+        report["user_id"],
+        "Ваш кейс был отклонён модератором и не был опубликован в канале.",
+        priority=PRIORITY_NOTIFY,
+        bot_id=report_bot_id(report),
+    )
 
     await callback.message.answer(f"Заявка #{report_id} отклонена.")
     await callback.answer("Отклонено", show_alert=False)
 
 
+# =========================
+# ЗАЯВКИ БЕЗ РЕШЕНИЯ
+# =========================
+
+
+async def notify_expired(report: dict) -> None:
+    close_admin_copies_later(report)
+    days = PENDING_EXPIRE_AFTER / 86400
+    await outbox.send_message(
+        report["user_id"],
+        f"Ваш кейс про гостя {escape(report['guest_name'])} не был рассмотрен "
+        f"модераторами за {days:g} дн. и закрыт. Вы можете отправить его заново.",
+        priority=PRIORITY_NOTIFY,
+        bot_id=report_bot_id(report),
+    )
+
+
+async def send_pending_digest(count: int, oldest: list[dict]) -> None:
+    """Одно сообщение каждому админу со всеми зависшими заявками."""
+    if len(tenants) == 1:
+        await send_tenant_digest(tenants.default, count, oldest)
+        return
+    # у каждого бота свои админы — каждому своя сводка
+    cutoff = (datetime.now() - timedelta(seconds=PENDING_REMIND_AFTER)).isoformat()
+    for tenant in tenants:
+        count, oldest = await report_store.pending_older_than(cutoff, bot_id=tenant.bot_id)
+        if count:
+            await send_tenant_digest(tenant, count, oldest)
+
+
+async def send_tenant_digest(tenant: Tenant, count: int, oldest: list[dict]) -> None:
+    hours = PENDING_REMIND_AFTER / 3600
+    lines = [f"⏰ Ждут модерации дольше {hours:g} ч: <b>{count}</b>", ""]
+    for report in oldest:
+        lines.append(
+            f"• <b>#{report['id']}</b> от {report['created_at'][:16].replace('T', ' ')}"
+            f" — {escape(report['country'])}, {escape(report['city'])},"
+            f" {escape(report['guest_name'])}"
+        )
+    if count > len(oldest):
+        lines.append(f"… и ещё {count - len(oldest)}")
+    text = "\n".join(lines)
+    await asyncio.gather(
+        *(
+            outbox.send_message(
+                admin_id, text, priority=PRIORITY_ADMIN, bot_id=tenant.bot_id
+            )
+            for admin_id in tenant.settings.current.admin_ids
+        )
+    )
+
+
+# Один планировщик на процесс: закрывает просроченные заявки
+# и раз в PENDING_DIGEST_INTERVAL напоминает админам о зависших
+pending_lifecycle = PendingLifecycle(
+    report_store,
+    expire_after=PENDING_EXPIRE_AFTER,
+    remind_after=PENDING_REMIND_AFTER,
+    digest_interval=PENDING_DIGEST_INTERVAL,
+    on_expired=notify_expired,
+    on_digest=send_pending_digest,
+)
+
+
+# =========================
+# ПОИСК ПО БАЗЕ
+# =========================
+
+
+@router.message(Command("check"))
+async def cmd_check(message: Message, bot: Bot):
+    parts = message.text.split(maxsplit=1)
+    if len(parts) < 2 or not phone_key(parts[1]):
+        await message.answer("Использование: /check +79781234567")
+        return
+
+    if not is_admin(bot.id, message.from_user.id) and not await check_subscription(
+        bot, message.from_user.id
+    ):
+        await message.answer(
+            f"Поиск доступен только подписчикам канала {current_channel(bot.id)}"
+        )
+        return
+
+    phone = phone_key(parts[1])
+    report_ids = phone_index.lookup(phone)
+    if not report_ids:
+        await message.answer(
+            f"По номеру <code>{escape(phone)}</code> опубликованных кейсов нет."
+        )
+        return
+
+    reports = await report_store.get_many(report_ids[-10:])
+    lines = [
+        f"⚠️ По номеру <code>{escape(phone)}</code> найдено кейсов: {len(report_ids)}",
+        "",
+    ]
+    for report in reports:
+        lines.append(
+            f"• {report['created_at'][:10]} — {escape(report['country'])}, "
+            f"{escape(report['city'])} — {escape(report['guest_name'])}"
+        )
+    await message.answer("\n".join(lines))
+
+
+@router.inline_query()
+async def inline_search_query(inline_query: InlineQuery, bot: Bot):
+    user_id = inline_query.from_user.id
+    if not is_admin(bot.id, user_id) and not await check_subscription(bot, user_id):
+        await inline_query.answer(
+            [],
+            cache_time=60,
+            is_personal=True,
+            button=InlineQueryResultsButton(
+                text=f"Поиск только для подписчиков {current_channel(bot.id)}",
+                start_parameter="inline",
+            ),
+        )
+        return
+
+    report_ids = inline_search.search(inline_query.query)
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    page = report_ids[offset:offset + INLINE_PAGE_SIZE]
+    reports = {r["id"]: r for r in await report_store.get_many(list(page))}
+
+    results = []
+    for report_id in page:
+        report = reports.get(report_id)
+        if report is None:
+            continue
+        results.append(
+            InlineQueryResultArticle(
+                id=report_id,
+                title=report["guest_name"],
+                description=(
+                    f"{report['phone']} · {report['country']}, {report['city']}"
+                ),
+                input_message_content=InputTextMessageContent(
+                    message_text=build_post_text(
+                        report["country"],
+                        report["city"],
+                        report["guest_name"],
+                        report["phone"],
+                        report["description"],
+                    ),
+                ),
+            )
+        )
+
+    next_offset = offset + INLINE_PAGE_SIZE
+    await inline_query.answer(
+        results,
+        cache_time=30,
+        is_personal=True,
+        next_offset=str(next_offset) if next_offset < len(report_ids) else "",
+    )
+
+
+# =========================
+# СТАТИСТИКА ДЛЯ АДМИНОВ
+# =========================
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message, bot: Bot):
+    if not is_admin(bot.id, message.from_user.id):
+        return
+    # сводки общие на все боты (с id модераторов), поэтому при нескольких
+    # ботах их видят только админы основного
+    if len(tenants) > 1 and message.from_user.id not in settings_for(
+        tenants.default.bot_id
+    ).admin_ids:
+        await message.answer("Статистика по всем регионам доступна админам основного бота.")
+        return
+    # счётчики обновляются при подаче и решении по заявке (см. ReportStore),
+    # поэтому здесь читаются только готовые сводки
+    await message.answer(render_stats(await report_store.stats()))
+
+
 # =========================
 # АДМИН-КОМАНДЫ ДЛЯ СТРАН
 # =========================
 
 
 @router.message(Command("list_countries"))
-async def cmd_list_countries(message: Message):
-    if message.from_user.id not in ADMIN_IDS:
+async def cmd_list_countries(message: Message, bot: Bot):
+    if not is_admin(bot.id, message.from_user.id):
         return
-    countries = load_countries()
+    countries = tenants.get(bot.id).countries.get()
     await message.answer("Текущий список стран:\n" + "\n".join(countries))
 
 
 @router.message(Command("add_country"))
-async def cmd_add_country(message: Message):
-    if message.from_user.id not in ADMIN_IDS:
+async def cmd_add_country(message: Message, bot: Bot):
+    country_list = tenants.get(bot.id).countries
+    if not is_admin(bot.id, message.from_user.id):
         return
     parts = message.text.split(maxsplit=1)
     if len(parts) < 2:
         await message.answer("Использование: /add_country НазваниеСтраны")
         return
     new_country = parts[1].strip()
-    countries = load_countries()
+    countries = country_list.load()
     if new_country in countries:
         await message.answer("Такая страна уже есть.")
         return
     countries.append(new_country)
-    save_countries(countries)
+    country_list.save(countries)
     await message.answer(f"Страна «{new_country}» добавлена.")
 
 
 @router.message(Command("del_country"))
-async def cmd_del_country(message: Message):
-    if message.from_user.id not in ADMIN_IDS:
+async def cmd_del_country(message: Message, bot: Bot):
+    country_list = tenants.get(bot.id).countries
+    if not is_admin(bot.id, message.from_user.id):
         return
     parts = message.text.split(maxsplit=1)
     if len(parts) < 2:
         await message.answer("Использование: /del_country НазваниеСтраны")
         return
     name = parts[1].strip()
-    countries = load_countries()
+    countries = country_list.load()
     if name not in countries:
         await message.answer("Такой страны нет в списке.")
         return
     countries.remove(name)
-    save_countries(countries)
+    country_list.save(countries)
     await message.answer(f"Страна «{name}» удалена.")
+
+
+# =========================
+# ЗАПУСК И ОСТАНОВКА
+# =========================
+
+
+@router.startup()
+async def on_startup(bot: Bot, bots: list[Bot] | None = None):
+    # при polling нескольких ботов aiogram передаёт их все в bots
+    bots = bots or [bot]
+    if len(tenants) > 1:
+        assigned = await report_store.assign_bot(tenants.default.bot_id)
+        if assigned:
+            logger.info("Заявок без бота закреплено за %s: %d", tenants.default.name, assigned)
+    await sync_indexes()
+    # первый бот outbox — для заданий без bot_id, т.е. бот по умолчанию
+    await outbox.start(*sorted(bots, key=lambda b: b.id != tenants.default.bot_id))
+    await pending_lifecycle.start()
+    for tenant in tenants:
+        await tenant.settings.start()
+    reload_on_sighup([tenant.settings for tenant in tenants])
+
+    # Одобренные, но не поставленные в очередь заявки (процесс упал
+    # сразу после одобрения) — ставим ещё раз; дубль отсечёт dedup_key.
+    # Начатые публикации (publish_claim) не повторяем: пост мог уже выйти
+    for report in await report_store.find_by_status(STATUS_APPROVED, limit=1000):
+        if report["publish_claim"] is None:
+            await publish_report_to_channel(report, report["decided_by"])
+
+    # чужие публикации (другие процессы) и архив, импортированный на ходу;
+    # по курсору событий это один короткий запрос
+    global index_sync_task
+    index_sync_task = asyncio.create_task(sync_indexes_forever(), name="index-sync")
+
+
+@router.shutdown()
+async def on_shutdown():
+    # неотправленное остаётся в журнале outbox и уйдёт после перезапуска
+    stop_reload_on_sighup()
+    for tenant in tenants:
+        await tenant.settings.stop()
+    await pending_lifecycle.stop()
+    await outbox.stop()
+    photo_index.close()
+    if index_sync_task is not None:
+        index_sync_task.cancel()
+        await asyncio.gather(index_sync_task, return_exceptions=True)
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await report_store.close()
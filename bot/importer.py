@@ -0,0 +1,230 @@
+"""Импорт архива канала из экспорта Telegram Desktop (result.json).
+
+    python -m bot.importer path/to/result.json [--batch 500]
+
+Файл читается потоково, по одному сообщению, поэтому память не растёт
+с размером экспорта. Прогресс сохраняется в базе вместе с каждой пачкой:
+повторный запуск продолжит с места остановки.
+"""
+import argparse
+import asyncio
+import codecs
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .config import REPORTS_DB
+from .e164 import code_for_country, to_e164
+from .reports import ReportStore, STATUS_PUBLISHED
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+
+_SEPARATORS = frozenset(" \t\r\n,")
+_MESSAGES_KEY = re.compile(r'"messages"\s*:\s*\[')
+
+# Поля поста в том виде, в каком их пишет build_post_text
+_FIELDS = (
+    ("country", re.compile(r"^\s*Страна:\s*(.+?)\s*$", re.M)),
+    ("city", re.compile(r"^\s*Город:\s*(.+?)\s*$", re.M)),
+    ("guest_name", re.compile(r"^\s*ФИО гостя:\s*(.+?)\s*$", re.M)),
+    ("phone", re.compile(r"^\s*Телефон:\s*(.+?)\s*$", re.M)),
+)
+_DESCRIPTION = re.compile(r"^\s*Описание(?: ситуации)?:\s*(.*)\Z", re.M | re.S)
+
+
+def iter_messages(path: str | Path, offset: int = 0):
+    """Сообщения из массива ``messages``: пары (сообщение, смещение в байтах
+    сразу после него).
+
+    С ``offset`` > 0 чтение начинается с этого места внутри массива (так
+    продолжается прерванный импорт). В памяти одновременно лежит не больше
+    одного куска файла и одного сообщения.
+    """
+    decoder = json.JSONDecoder()
+    # инкрементальный декодер сам склеит символ, разрезанный границей куска
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        text = ""
+        i = 0
+        eof = False
+
+        def fill() -> None:
+            nonlocal text, i, eof
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            text = text[i:] + utf8.decode(chunk, final=eof)
+            i = 0
+
+        if offset:
+            f.seek(offset)
+            pos = offset
+        else:
+            # заголовок экспорта (name, type, id) небольшой
+            while not (match := _MESSAGES_KEY.search(text)):
+                if eof:
+                    raise ValueError("В файле нет массива messages")
+                fill()
+            i = match.end()
+            pos = len(text[:i].encode("utf-8"))
+
+        while True:
+            # пропускаем пробелы и запятые между элементами (всё ASCII,
+            # так что символы и байты совпадают)
+            while True:
+                while i < len(text) and text[i] in _SEPARATORS:
+                    i += 1
+                    pos += 1
+                if i < len(text) or eof:
+                    break
+                fill()
+            if i >= len(text):
+                raise ValueError("Файл оборвался внутри массива messages")
+            if text[i] == "]":
+                return
+
+            while True:
+                try:
+                    message, end = decoder.raw_decode(text, i)
+                    break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+            pos += len(text[i:end].encode("utf-8"))
+            i = end
+            yield message, pos
+
+
+def message_text(message: dict) -> str:
+    """Текст сообщения: в экспорте это строка или список строк и сущностей."""
+    text = message.get("text", "")
+    if isinstance(text, str):
+        return text
+    return "".join(part if isinstance(part, str) else part.get("text", "") for part in text)
+
+
+def parse_post(message: dict) -> dict | None:
+    """Пост канала -> заявка в статусе published; None, если это не кейс."""
+    if message.get("type") != "message":
+        return None
+    text = message_text(message)
+    if "ФИО гостя:" not in text:
+        return None
+
+    report = {}
+    for field, pattern in _FIELDS:
+        match = pattern.search(text)
+        if not match:
+            return None
+        report[field] = match.group(1)
+    # номер в архиве — как его ввели; храним в E.164, как и новые заявки
+    report["phone"] = (
+        to_e164(report["phone"], code_for_country(report["country"])) or report["phone"]
+    )
+    match = _DESCRIPTION.search(text)
+    report["description"] = match.group(1).strip() if match else ""
+
+    created_at = datetime.fromisoformat(message["date"]).isoformat()
+    report.update(
+        id=f"channel_{message['id']}",
+        # автор архивного поста неизвестен
+        user_id=0,
+        user_username=None,
+        user_first_name=None,
+        # file_id из экспорта не получить, у архивных кейсов фото нет
+        photo_ids=[],
+        status=STATUS_PUBLISHED,
+        created_at=created_at,
+        decided_at=created_at,
+        decided_by=None,
+    )
+    return report
+
+
+async def import_export(
+    store: ReportStore,
+    path: str | Path,
+    batch_size: int = 500,
+    progress_every: float = 5.0,
+) -> dict[str, int]:
+    """Загружаем архив в базу пачками; одна пачка — одна транзакция."""
+    path = Path(path).resolve()
+    source = str(path)
+    checkpoint = await store.import_checkpoint(source)
+    offset = checkpoint["byte_offset"] if checkpoint else 0
+    if offset:
+        logger.info(
+            "Продолжаем импорт с байта %d (сообщение %s)",
+            offset,
+            checkpoint["last_message_id"],
+        )
+
+    total_size = path.stat().st_size
+    counts = {"messages": 0, "posts": 0, "imported": 0}
+    batch: list[dict] = []
+    last_id = checkpoint["last_message_id"] if checkpoint else None
+    position = offset
+    started = last_report = time.perf_counter()
+
+    async def flush() -> None:
+        counts["imported"] += await store.import_published(
+            batch, source, position, last_id
+        )
+        batch.clear()
+
+    for message, position in iter_messages(path, offset):
+        counts["messages"] += 1
+        last_id = message.get("id", last_id)
+        report = parse_post(message)
+        if report is not None:
+            counts["posts"] += 1
+            batch.append(report)
+        if len(batch) >= batch_size:
+            await flush()
+
+        now = time.perf_counter()
+        if now - last_report >= progress_every:
+            last_report = now
+            logger.info(
+                "%.1f%%: сообщений %d (%.0f/с), кейсов %d, добавлено %d",
+                position / total_size * 100,
+                counts["messages"],
+                counts["messages"] / (now - started),
+                counts["posts"],
+                counts["imported"],
+            )
+
+    await flush()
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Готово за %.1f с: сообщений %d (%.0f/с), кейсов %d, добавлено %d",
+        elapsed,
+        counts["messages"],
+        counts["messages"] / elapsed if elapsed else 0,
+        counts["posts"],
+        counts["imported"],
+    )
+    return counts
+
+
+async def main(path: str, batch_size: int) -> None:
+    store = ReportStore(REPORTS_DB)
+    try:
+        await import_export(store, path, batch_size)
+    finally:
+        await store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Импорт архива канала в базу кейсов")
+    parser.add_argument("path", help="result.json из экспорта Telegram Desktop")
+    parser.add_argument("--batch", type=int, default=500, help="кейсов в одной транзакции")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.path, args.batch))
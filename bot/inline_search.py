@@ -0,0 +1,170 @@
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+
+from .name_index import fold_token
+from .e164 import phone_prefix
+from .phone_index import phone_key
+
+_TOKEN = re.compile(r"[^\W\d_]+")
+_PHONE_QUERY = re.compile(r"[\d\s()+\-]+")
+
+MIN_PHONE_PREFIX = 3
+MIN_NAME_PREFIX = 2
+
+
+class PrefixIndex:
+    """Отсортированный массив пар (ключ, report_id) с поиском по префиксу.
+
+    Поиск — bisect до первого ключа с нужным префиксом и проход вперёд,
+    пока префикс совпадает, т.е. O(log n + k), где k — сколько результатов
+    реально забрали. Вставка одной записи — сдвиг массива (memmove),
+    для массовой загрузки есть bulk_load.
+    """
+
+    def __init__(self):
+        self._entries: list[tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str, report_id: str) -> None:
+        entry = (key, report_id)
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            return
+        self._entries.insert(i, entry)
+
+    def bulk_load(self, pairs) -> None:
+        """Добавляем пары (ключ, report_id) одной сортировкой."""
+        self._entries.extend(pairs)
+        self._entries = sorted(set(self._entries))
+
+    def count_prefix(self, prefix: str) -> int:
+        """Сколько ключей начинается с ``prefix`` — два bisect, без прохода."""
+        return bisect_left(self._entries, (prefix + "\uffff",)) - bisect_left(
+            self._entries, (prefix,)
+        )
+
+    def iter_prefix(self, prefix: str):
+        """id заявок, у которых ключ начинается с ``prefix`` (в порядке ключей)."""
+        entries = self._entries
+        for i in range(bisect_left(entries, (prefix,)), len(entries)):
+            key, report_id = entries[i]
+            if not key.startswith(prefix):
+                break
+            yield report_id
+
+
+class InlineSearch:
+    """Поиск опубликованных кейсов по началу номера или ФИО.
+
+    Номера ищутся по префиксу нормализованного номера, ФИО — по префиксам
+    транслитерированных слов (в любом порядке). Результаты недавних
+    запросов держим в LRU-кэше по нормализованному запросу, чтобы
+    листание (next_offset) и набор текста не пересчитывали одно и то же.
+    """
+
+    def __init__(self, cache_size: int = 1024, max_results: int = 200):
+        self.cache_size = cache_size
+        self.max_results = max_results
+        self._phones = PrefixIndex()
+        self._names = PrefixIndex()
+        # report_id -> слова ФИО, для проверки остальных слов запроса
+        self._tokens: dict[str, tuple[str, ...]] = {}
+        self._cache: OrderedDict[tuple, tuple[str, ...]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    @staticmethod
+    def _name_tokens(guest_name: str) -> tuple[str, ...]:
+        return tuple(t for t in map(fold_token, _TOKEN.findall(guest_name)) if t)
+
+    def add(self, report_id: str, phone: str, guest_name: str) -> None:
+        if report_id in self._tokens:
+            return
+        tokens = self._name_tokens(guest_name)
+        self._tokens[report_id] = tokens
+        phone = phone_key(phone).lstrip("+")
+        if phone:
+            self._phones.add(phone, report_id)
+        for token in set(tokens):
+            self._names.add(token, report_id)
+        # новые кейсы могут попасть в любой из закэшированных ответов
+        self._cache.clear()
+
+    def bulk_load(self, rows) -> None:
+        """Заполняем индекс из троек (report_id, phone, guest_name)."""
+        phones, names = [], []
+        for report_id, phone, guest_name in rows:
+            if report_id in self._tokens:
+                continue
+            tokens = self._name_tokens(guest_name)
+            self._tokens[report_id] = tokens
+            phone = phone_key(phone).lstrip("+")
+            if phone:
+                phones.append((phone, report_id))
+            names.extend((token, report_id) for token in set(tokens))
+        if phones:
+            self._phones.bulk_load(phones)
+        if names:
+            self._names.bulk_load(names)
+        self._cache.clear()
+
+    @classmethod
+    def normalize_query(cls, query: str) -> tuple | None:
+        """Запрос -> ключ кэша: ("phone", префикс) или ("name", слова)."""
+        query = query.strip()
+        if _PHONE_QUERY.fullmatch(query):
+            # ключи телефонов — цифры E.164, запрос приводим так же
+            digits = phone_prefix(query)
+            if len(digits) < MIN_PHONE_PREFIX:
+                return None
+            return ("phone", digits)
+        tokens = cls._name_tokens(query)
+        if not tokens or max(map(len, tokens)) < MIN_NAME_PREFIX:
+            return None
+        return ("name", *sorted(set(tokens)))
+
+    def _search_phone(self, prefix: str) -> tuple[str, ...]:
+        found = []
+        for report_id in self._phones.iter_prefix(prefix):
+            found.append(report_id)
+            if len(found) >= self.max_results:
+                break
+        return tuple(found)
+
+    def _search_name(self, tokens) -> tuple[str, ...]:
+        # кандидаты берём по самому редкому слову запроса, остальные слова
+        # должны быть началом какого-то слова ФИО
+        first = min(tokens, key=self._names.count_prefix)
+        rest = [t for t in tokens if t != first]
+        found = {}
+        for report_id in self._names.iter_prefix(first):
+            if report_id in found:
+                continue
+            words = self._tokens[report_id]
+            if all(any(w.startswith(t) for w in words) for t in rest):
+                found[report_id] = None
+                if len(found) >= self.max_results:
+                    break
+        return tuple(found)
+
+    def search(self, query: str) -> tuple[str, ...]:
+        """id подходящих заявок (не больше max_results)."""
+        key = self.normalize_query(query)
+        if key is None:
+            return ()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        if key[0] == "phone":
+            result = self._search_phone(key[1])
+        else:
+            result = self._search_name(key[1:])
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
@@ -6,7 +8,11 @@ from aiogram.types import (
 )
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from .countries import load_countries
+from .countries import CountryList, default_countries
+
+# Готовая клавиатура стран и снимок списка, из которого она собрана
+# (по одной на файл со странами)
+_countries_markup: dict[Path, tuple[tuple[str, ...], InlineKeyboardMarkup]] = {}
 
 
 def start_keyboard() -> InlineKeyboardMarkup:
@@ -16,9 +22,15 @@ def start_keyboard() -> InlineKeyboardMarkup:
     return kb.as_markup()
 
 
-def countries_keyboard() -> InlineKeyboardMarkup:
+def countries_keyboard(country_list: CountryList = default_countries) -> InlineKeyboardMarkup:
+    countries = country_list.get()
+    # Пересобираем клавиатуру, только если список стран поменялся
+    cached = _countries_markup.get(country_list.path)
+    if cached is not None and cached[0] is countries:
+        return cached[1]
+
     kb = InlineKeyboardBuilder()
-    for country in load_countries():
+    for country in countries:
         kb.button(text=country, callback_data=f"country:{country}")
 
     # Добавляем кнопку "Другая страна"
@@ -26,7 +38,9 @@ def countries_keyboard() -> InlineKeyboardMarkup:
 
     # ОДНА кнопка в строке
     kb.adjust(1)
-    return kb.as_markup()
+    markup = kb.as_markup()
+    _countries_markup[country_list.path] = (countries, markup)
+    return markup
 
 
 def photos_keyboard() -> ReplyKeyboardMarkup:
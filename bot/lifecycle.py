@@ -0,0 +1,129 @@
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from .reports import ReportStore, STATUS_EXPIRED, STATUS_PENDING
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(created_at: str) -> float:
+    return datetime.fromisoformat(created_at).timestamp()
+
+
+class PendingLifecycle:
+    """Срок жизни заявок на модерации.
+
+    Одна фоновая задача спит до ближайшего события: срока истечения
+    самой старой заявки (куча дедлайнов) или следующей сводки для админов.
+    Просроченная заявка атомарно переводится в ``expired`` — если её
+    успели рассмотреть или закрыл другой процесс, ничего не происходит.
+    В куче лежат только пары (дедлайн, id), поэтому память и число
+    пробуждений не зависят от потока заявок.
+    """
+
+    def __init__(
+        self,
+        store: ReportStore,
+        expire_after: float,
+        remind_after: float,
+        digest_interval: float,
+        on_expired: Callable[[dict], Awaitable[None]],
+        on_digest: Callable[[int, list[dict]], Awaitable[None]],
+    ):
+        self.store = store
+        self.expire_after = expire_after
+        self.remind_after = remind_after
+        self.digest_interval = digest_interval
+        self.on_expired = on_expired
+        self.on_digest = on_digest
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heap: list[tuple[float, str]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.expired = 0
+        self.digests = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def track(self, report_id: str, created_at: str) -> None:
+        """Заявка ушла на модерацию — ставим ей срок."""
+        if not self.expire_after:
+            return
+        deadline = _timestamp(created_at) + self.expire_after
+        heapq.heappush(self._heap, (deadline, report_id))
+        if self._heap[0][1] == report_id:
+            # новый срок раньше того, до которого спит планировщик
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if not self.expire_after and not self.digest_interval:
+            return
+        if self.expire_after:
+            self._heap = [
+                (_timestamp(created_at) + self.expire_after, report_id)
+                for report_id, created_at in await self.store.pending()
+            ]
+            heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run(), name="pending-lifecycle")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _next_digest(self, now: float) -> float:
+        if not self.digest_interval:
+            return float("inf")
+        return (now // self.digest_interval + 1) * self.digest_interval
+
+    async def _run(self) -> None:
+        next_digest = self._next_digest(time.time())
+        while True:
+            now = time.time()
+            deadline = min(next_digest, self._heap[0][0] if self._heap else float("inf"))
+            if deadline > now:
+                self._wakeup.clear()
+                timeout = None if deadline == float("inf") else deadline - now
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                while self._heap and self._heap[0][0] <= now:
+                    _, report_id = heapq.heappop(self._heap)
+                    await self._expire(report_id)
+                if next_digest <= now:
+                    slot = int(next_digest // self.digest_interval)
+                    next_digest = self._next_digest(now)
+                    await self._digest(slot, now)
+            except Exception:
+                logger.exception("Ошибка планировщика заявок")
+
+    async def _expire(self, report_id: str) -> None:
+        report = await self.store.transition(report_id, STATUS_PENDING, STATUS_EXPIRED)
+        if report is None:
+            return
+        self.expired += 1
+        await self.on_expired(report)
+
+    async def _digest(self, slot: int, now: float) -> None:
+        # сводку за интервал отправляет только один процесс
+        if not await self.store.claim_slot("digest", slot, self.owner):
+            return
+        cutoff = datetime.fromtimestamp(now - self.remind_after).isoformat()
+        count, oldest = await self.store.pending_older_than(cutoff)
+        if not count:
+            return
+        self.digests += 1
+        await self.on_digest(count, oldest)
@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+from aiohttp import web
+from aiogram import BaseMiddleware, Bot, Router
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.methods import TelegramMethod
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class CounterMetric:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Counter[tuple] = Counter()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self._values[label_values] += amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for values, amount in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labels, values)} {amount}")
+        return lines
+
+
+class HistogramMetric:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # значения меток -> [счётчики по корзинам (+Inf последней), сумма]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for values, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, values + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Набор метрик плюс «сборщики» — функции, которые в момент запроса
+    отдают текущие значения (глубина очереди, размер кэша и т.п.)."""
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list[Callable[[], dict[str, float]]] = []
+
+    def counter(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> CounterMetric:
+        metric = CounterMetric(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> HistogramMetric:
+        metric = HistogramMetric(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], dict[str, float]]) -> None:
+        """``collector()`` возвращает {имя_метрики: значение}; имена на
+        ``_total`` отдаются как counter, остальные — как gauge."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                values = collector()
+            except Exception:
+                logger.exception("Ошибка сборщика метрик")
+                continue
+            for name, value in values.items():
+                kind = "counter" if name.endswith("_total") else "gauge"
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+handler_latency = registry.histogram(
+    "bot_handler_seconds", "Время работы хендлера", ("handler", "state")
+)
+handler_errors = registry.counter(
+    "bot_handler_errors_total", "Исключения в хендлерах", ("handler", "error")
+)
+api_latency = registry.histogram(
+    "bot_api_request_seconds", "Время запроса к Bot API", ("method",)
+)
+api_errors = registry.counter(
+    "bot_api_errors_total", "Ошибки Bot API", ("method", "error")
+)
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """Внутренний middleware: меряет только сам хендлер (после фильтров)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[Any, dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object: HandlerObject | None = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        state = data.get("raw_state") or "-"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            handler_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            handler_latency.observe(time.perf_counter() - started, name, state)
+
+
+class ApiTimingMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время и ошибки каждого метода Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ):
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            api_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            api_latency.observe(time.perf_counter() - started, name)
+
+
+def instrument_router(router: Router) -> None:
+    """Вешаем замер на все события роутера (message, callback_query, …)."""
+    middleware = HandlerTimingMiddleware()
+    for name, observer in router.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(middleware)
+
+
+def instrument_bot(bot: Bot) -> None:
+    bot.session.middleware(ApiTimingMiddleware())
+
+
+class SamplingProfiler:
+    """Простой сэмплирующий профайлер: раз в ``interval`` секунд снимает
+    стек потока event loop. Работает только во время запроса ``/profile``,
+    в остальное время ничего не стоит.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def _sample(self, thread_id: int, seconds: float) -> Counter[str]:
+        stacks: Counter[str] = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                stacks[";".join(reversed(names))] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    async def profile(self, seconds: float) -> str:
+        """Стеки в формате collapsed (для flamegraph.pl / speedscope)."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Профилирование уже идёт")
+        try:
+            thread_id = threading.get_ident()
+            stacks = await asyncio.to_thread(self._sample, thread_id, seconds)
+        finally:
+            self._lock.release()
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+async def start_metrics_server(
+    host: str,
+    port: int,
+    profiler: SamplingProfiler | None = None,
+) -> web.AppRunner:
+    """HTTP-эндпоинт ``/metrics`` (формат Prometheus) и, если включён,
+    ``/profile?seconds=N``."""
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            text=registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def profile(request: web.Request) -> web.Response:
+        seconds = min(float(request.query.get("seconds", "10")), 60.0)
+        try:
+            text = await profiler.profile(seconds)
+        except RuntimeError as e:
+            return web.Response(status=409, text=str(e))
+        return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    if profiler is not None:
+        app.router.add_get("/profile", profile)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Метрики доступны на http://%s:%s/metrics", host, port)
+    return runner
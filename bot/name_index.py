@@ -0,0 +1,165 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain, islice
+
+# Кириллица -> латиница (упрощённая транслитерация)
+_CYR_TO_LAT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e",
+    "ж": "zh", "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "h", "ц": "c", "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "",
+    "ы": "i", "ь": "", "э": "e", "ю": "iu", "я": "ia",
+    # казахские и белорусские буквы
+    "ә": "a", "ғ": "g", "қ": "k", "ң": "n", "ө": "o", "ұ": "u", "ү": "u",
+    "һ": "h", "і": "i", "ў": "u",
+}
+
+# Разные схемы латинской транслитерации сводим к одному написанию.
+# Порядок важен: сначала длинные сочетания.
+_LAT_FOLDS = (
+    ("shch", "sh"),
+    ("sch", "sh"),
+    ("kh", "h"),
+    ("tch", "ch"),
+    ("tsz", "c"),
+    ("ts", "c"),
+    ("tz", "c"),
+    ("ck", "k"),
+    ("ph", "f"),
+    ("x", "ks"),
+    ("q", "k"),
+    ("w", "v"),
+    ("j", "i"),
+    ("y", "i"),
+)
+
+# Триграммы, которые есть больше чем у такой доли имён (но не меньше чем
+# у MIN_PRUNED_POSTING), при поиске кандидатов пропускаются
+PRUNED_POSTING_SHARE = 0.05
+MIN_PRUNED_POSTING = 1000
+
+_TOKEN = re.compile(r"[^\W\d_]+")
+_REPEATS = re.compile(r"(.)\1+")
+
+
+# имена сильно повторяются, поэтому кэшируем свёртку слов
+@lru_cache(maxsize=65536)
+def fold_token(token: str) -> str:
+    token = "".join(_CYR_TO_LAT.get(ch, ch) for ch in token.lower())
+    for src, dst in _LAT_FOLDS:
+        token = token.replace(src, dst)
+    return _REPEATS.sub(r"\1", token)
+
+
+def normalize_name(name: str) -> str:
+    """ФИО -> транслитерированные токены в алфавитном порядке."""
+    tokens = [fold_token(t) for t in _TOKEN.findall(name)]
+    return " ".join(sorted(t for t in tokens if t))
+
+
+def trigrams(normalized: str) -> set[str]:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Триграммный индекс ФИО для поиска похожих написаний.
+
+    Имена нормализуются (транслитерация, сортировка токенов), после чего
+    похожесть считается коэффициентом Дайса по множествам триграмм.
+    Индекс пополняется по одной записи, без перестроения.
+    """
+
+    def __init__(self):
+        # doc_id -> (report_id, исходное ФИО, число триграмм)
+        self._docs: list[tuple[str, str, int]] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        self._report_ids: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, report_id: str, guest_name: str) -> None:
+        if report_id in self._report_ids:
+            return
+        grams = trigrams(normalize_name(guest_name))
+        if not grams:
+            return
+        doc_id = len(self._docs)
+        self._docs.append((report_id, guest_name, len(grams)))
+        self._report_ids.add(report_id)
+        for gram in grams:
+            self._postings[gram].append(doc_id)
+
+    def bulk_load(self, rows) -> None:
+        """Заполняем индекс из пар (report_id, guest_name)."""
+        for report_id, guest_name in rows:
+            self.add(report_id, guest_name)
+
+    def search(
+        self,
+        guest_name: str,
+        k: int = 5,
+        min_score: float = 0.5,
+        max_candidates: int = 200,
+    ) -> list[tuple[float, str, str]]:
+        """Топ-k похожих кейсов: (похожесть, report_id, ФИО).
+
+        Частые триграммы («  i», « iv») есть почти у всех имён, и подсчёт
+        по их спискам стоил бы O(N) на каждую заявку. Поэтому кандидатов
+        собираем только по редким триграммам запроса (префиксный фильтр:
+        похожее имя обязательно содержит хотя бы одну из них, а слишком
+        частые пропускаем), оставляем ``max_candidates`` лучших и уже их
+        оцениваем точно.
+        """
+        grams = trigrams(normalize_name(guest_name))
+        if not grams:
+            return []
+
+        postings = self._postings
+        found = sorted((postings[g] for g in grams if g in postings), key=len)
+        # Дайс = 2c / (total + size) >= min_score и c <= size дают
+        # c >= min_score * total / (2 - min_score)
+        total = len(grams)
+        need = max(1, math.ceil(min_score * total / (2 - min_score) - 1e-9))
+        if len(found) < need:
+            return []
+        # без любых need - 1 триграмм имя ещё может пройти порог, поэтому
+        # хотя бы одна из остальных (самых редких) у него есть
+        rare = found[:len(found) - need + 1]
+        # списки длиннее max_posting (имена, отчества) кандидатов почти не
+        # отсеивают, а стоят дороже всего; самый редкий берём всегда
+        max_posting = max(MIN_PRUNED_POSTING, len(self._docs) * PRUNED_POSTING_SHARE)
+        rare = rare[:1] + [posting for posting in rare[1:] if len(posting) <= max_posting]
+        shared = Counter(chain.from_iterable(rare))
+        candidates = self._top(shared, max_candidates)
+
+        docs = self._docs
+        scored = []
+        for doc_id in candidates:
+            report_id, name, size = docs[doc_id]
+            score = 2 * len(grams & trigrams(normalize_name(name))) / (total + size)
+            if score >= min_score:
+                scored.append((score, report_id, name))
+        return heapq.nlargest(k, scored)
+
+    @staticmethod
+    def _top(shared: Counter, limit: int) -> list[int]:
+        """До ``limit`` кандидатов с наибольшим числом общих триграмм.
+
+        Счётчики — маленькие целые, поэтому вместо сортировки идём по
+        гистограмме сверху вниз до порога, который даёт ``limit`` кандидатов.
+        """
+        if len(shared) <= limit:
+            return list(shared)
+        levels = Counter(shared.values())
+        kept, level = 0, max(levels)
+        while kept + levels[level] < limit:
+            kept += levels[level]
+            level -= 1
+        above = [doc_id for doc_id, common in shared.items() if common > level]
+        at_level = (doc_id for doc_id, common in shared.items() if common == level)
+        return above + list(islice(at_level, limit - kept))
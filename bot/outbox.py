@@ -0,0 +1,428 @@
+import asyncio
+import itertools
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.types import InlineKeyboardMarkup, InputMediaPhoto
+
+from .ratelimit import SendRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Классы приоритета: чем меньше число, тем раньше отправка
+PRIORITY_CHANNEL = 0
+PRIORITY_ADMIN = 1
+PRIORITY_NOTIFY = 2
+
+
+async def _send_message(bot: Bot, payload: dict) -> Any:
+    markup = payload.get("reply_markup")
+    return await bot.send_message(
+        chat_id=payload["chat_id"],
+        text=payload["text"],
+        reply_markup=InlineKeyboardMarkup.model_validate(markup) if markup else None,
+    )
+
+
+async def _send_media_group(bot: Bot, payload: dict) -> Any:
+    media = []
+    for i, pid in enumerate(payload["photo_ids"]):
+        if i == 0:
+            media.append(InputMediaPhoto(media=pid, caption=payload.get("caption")))
+        else:
+            media.append(InputMediaPhoto(media=pid))
+    return await bot.send_media_group(chat_id=payload["chat_id"], media=media)
+
+
+async def _edit_message_text(bot: Bot, payload: dict) -> Any:
+    # без reply_markup Telegram убирает клавиатуру
+    markup = payload.get("reply_markup")
+    return await bot.edit_message_text(
+        chat_id=payload["chat_id"],
+        message_id=payload["message_id"],
+        text=payload["text"],
+        reply_markup=InlineKeyboardMarkup.model_validate(markup) if markup else None,
+    )
+
+
+# Поддерживаемые методы: имя -> (вызов, сколько сообщений он «стоит»)
+METHODS: dict[str, tuple[Callable[[Bot, dict], Awaitable[Any]], Callable[[dict], int]]] = {
+    "send_message": (_send_message, lambda payload: 1),
+    "send_media_group": (_send_media_group, lambda payload: len(payload["photo_ids"])),
+    "edit_message_text": (_edit_message_text, lambda payload: 1),
+}
+
+
+class OutboxJob:
+    __slots__ = (
+        "job_id", "priority", "method", "payload", "tag", "attempts", "future", "slot",
+        "flood_wait",
+    )
+
+    def __init__(
+        self, job_id, priority, method, payload, tag, attempts=0, future=None, slot=False
+    ):
+        self.job_id = job_id
+        self.priority = priority
+        self.method = method
+        self.payload = payload
+        self.tag = tag
+        self.attempts = attempts
+        self.future = future
+        # занимает место в очереди (пришло через submit без follow_up)
+        self.slot = slot
+        # сколько секунд уже прождали по TelegramRetryAfter
+        self.flood_wait = 0.0
+
+
+class Outbox:
+    """Очередь исходящих сообщений с пулом воркеров.
+
+    * приоритеты: публикация в канал раньше уведомлений;
+    * ``TelegramRetryAfter`` — повтор ровно через ``retry_after`` секунд, но
+      в сумме не дольше ``max_flood_wait``, дальше задание снимается;
+    * сетевые и 5xx-ошибки — повтор с экспоненциальной задержкой;
+    * глубина очереди ограничена: ``submit`` ждёт, пока освободится место;
+    * каждое задание журналируется в хранилище и переживает перезапуск;
+    * задания в журнале арендуются процессом на ``lease`` секунд и
+      продлеваются, пока он жив; задания упавшего процесса подхватывают
+      остальные, а ``dedup_key`` не даёт поставить одно задание дважды.
+
+    Отправляет через один или несколько ботов: задание с ``bot_id`` уходит
+    через своего бота и под его лимитами, без ``bot_id`` — через первого.
+
+    Журнал — объект с асинхронными методами ``outbox_add``, ``outbox_delete``,
+    ``outbox_claim``, ``outbox_renew`` и ``outbox_release`` (см. ``ReportStore``).
+    """
+
+    def __init__(
+        self,
+        journal,
+        limiter: SendRateLimiter,
+        workers: int = 4,
+        max_queue: int = 1000,
+        max_attempts: int = 8,
+        base_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        lease: float = 120.0,
+        max_flood_wait: float = 3600.0,
+    ):
+        self.journal = journal
+        self.limiter = limiter
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.max_flood_wait = max_flood_wait
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._slots = asyncio.Semaphore(max_queue)
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        self._timers: set[asyncio.TimerHandle] = set()
+        self._listeners: list[Callable[[dict, Any], Awaitable[None]]] = []
+        self._guards: list[Callable[[dict], Awaitable[bool]]] = []
+        self._failure_listeners: list[Callable[[dict, Exception], Awaitable[None]]] = []
+        # bot_id -> (бот, его лимиты); первый бот — по умолчанию
+        self._bots: dict[int, tuple[Bot, SendRateLimiter]] = {}
+        self._default: tuple[Bot, SendRateLimiter] | None = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def add_listener(self, listener: Callable[[dict, Any], Awaitable[None]]) -> None:
+        """Вызывается ``listener(tag, result)`` после каждой успешной отправки
+        задания с тегом — в том числе восстановленного из журнала.
+
+        Задание удаляется из журнала только после всех обработчиков."""
+        self._listeners.append(listener)
+
+    def add_failure_listener(
+        self, listener: Callable[[dict, Exception], Awaitable[None]]
+    ) -> None:
+        """Вызывается ``listener(tag, error)``, когда от задания с тегом
+        окончательно отказались (ошибка Bot API или кончились попытки)."""
+        self._failure_listeners.append(listener)
+
+    def add_guard(self, guard: Callable[[dict], Awaitable[bool]]) -> None:
+        """Перед отправкой задания с тегом вызывается ``guard(tag)``; если
+        хотя бы один вернул ``False``, задание молча снимается (уже сделано)."""
+        self._guards.append(guard)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self, *bots: Bot) -> None:
+        self._bots = {
+            bot.id: (bot, self.limiter if i == 0 else self.limiter.clone())
+            for i, bot in enumerate(bots)
+        }
+        self._default = self._bots[bots[0].id]
+        await self._adopt()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"outbox-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._keep_leases(), name="outbox-lease"))
+
+    async def stop(self) -> None:
+        """Останавливаем воркеры; неотправленное остаётся в журнале
+        и сразу становится доступно другим процессам."""
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.journal.outbox_release(self.owner)
+
+    async def _adopt(self) -> None:
+        """Забираем из журнала ничьи задания: свои после перезапуска
+        или чужие, аренда которых истекла."""
+        now = time.time()
+        adopted = await self.journal.outbox_claim(self.owner, now, now + self.lease)
+        for job_id, priority, method, payload, tag in adopted:
+            self._put(OutboxJob(job_id, priority, method, payload, tag))
+        if adopted:
+            logger.info("Из журнала подхвачено исходящих: %s", len(adopted))
+
+    async def _keep_leases(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await self.journal.outbox_renew(self.owner, time.time() + self.lease)
+                await self._adopt()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Не удалось продлить аренду заданий outbox")
+
+    async def submit(
+        self,
+        method: str,
+        payload: dict,
+        priority: int = PRIORITY_NOTIFY,
+        tag: dict | None = None,
+        dedup_key: str | None = None,
+        follow_up: bool = False,
+    ) -> asyncio.Future:
+        """Ставим отправку в очередь.
+
+        Возвращает future с результатом вызова Bot API; ждать его не
+        обязательно — задание уже записано в журнал. Если задание с таким
+        ``dedup_key`` уже есть, новое не создаётся и future сразу равен ``None``.
+
+        ``follow_up=True`` — для заданий из обработчиков outbox (add_listener):
+        они не ждут места в очереди, иначе при полной очереди воркеры
+        ждали бы сами себя.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Неизвестный метод outbox: {method}")
+        slot = not follow_up
+        if slot:
+            await self._slots.acquire()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            job_id = await self.journal.outbox_add(
+                priority,
+                method,
+                payload,
+                tag,
+                dedup_key,
+                self.owner,
+                time.time() + self.lease,
+            )
+        except BaseException:
+            if slot:
+                self._slots.release()
+            raise
+        if job_id is None:
+            if slot:
+                self._slots.release()
+            future.set_result(None)
+            return future
+        self._put(
+            OutboxJob(job_id, priority, method, payload, tag, future=future, slot=slot)
+        )
+        return future
+
+    async def send_message(
+        self,
+        chat_id: int | str,
+        text: str,
+        reply_markup: InlineKeyboardMarkup | None = None,
+        priority: int = PRIORITY_NOTIFY,
+        tag: dict | None = None,
+        dedup_key: str | None = None,
+        bot_id: int | None = None,
+        follow_up: bool = False,
+    ) -> asyncio.Future:
+        payload = {"chat_id": chat_id, "text": text}
+        if reply_markup is not None:
+            payload["reply_markup"] = reply_markup.model_dump(mode="json", exclude_none=True)
+        if bot_id is not None:
+            payload["bot_id"] = bot_id
+        return await self.submit("send_message", payload, priority, tag, dedup_key, follow_up)
+
+    async def send_media_group(
+        self,
+        chat_id: int | str,
+        photo_ids: list[str],
+        caption: str | None = None,
+        priority: int = PRIORITY_NOTIFY,
+        tag: dict | None = None,
+        dedup_key: str | None = None,
+        bot_id: int | None = None,
+        follow_up: bool = False,
+    ) -> asyncio.Future:
+        payload = {"chat_id": chat_id, "photo_ids": list(photo_ids), "caption": caption}
+        if bot_id is not None:
+            payload["bot_id"] = bot_id
+        return await self.submit("send_media_group", payload, priority, tag, dedup_key, follow_up)
+
+    async def edit_message_text(
+        self,
+        chat_id: int | str,
+        message_id: int,
+        text: str,
+        reply_markup: InlineKeyboardMarkup | None = None,
+        priority: int = PRIORITY_NOTIFY,
+        tag: dict | None = None,
+        dedup_key: str | None = None,
+        bot_id: int | None = None,
+        follow_up: bool = False,
+    ) -> asyncio.Future:
+        payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
+        if reply_markup is not None:
+            payload["reply_markup"] = reply_markup.model_dump(mode="json", exclude_none=True)
+        if bot_id is not None:
+            payload["bot_id"] = bot_id
+        return await self.submit("edit_message_text", payload, priority, tag, dedup_key, follow_up)
+
+    # --- внутреннее ---
+
+    def _put(self, job: OutboxJob) -> None:
+        self._queue.put_nowait((job.priority, next(self._seq), job))
+
+    def _put_later(self, job: OutboxJob, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        timer = None
+
+        def fire():
+            self._timers.discard(timer)
+            self._put(job)
+
+        timer = loop.call_later(delay, fire)
+        self._timers.add(timer)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _finish(self, job: OutboxJob) -> None:
+        # место в очереди занимают только задания, пришедшие через submit()
+        if job.slot:
+            self._slots.release()
+        try:
+            await self.journal.outbox_delete(job.job_id)
+        except Exception:
+            logger.exception("Не удалось удалить задание %s из журнала", job.job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка outbox при обработке задания %s", job.job_id)
+
+    async def _process(self, job: OutboxJob) -> None:
+        call, cost = METHODS[job.method]
+        if job.tag:
+            for guard in self._guards:
+                if not await guard(job.tag):
+                    logger.info("Задание %s уже выполнено, пропускаем", job.tag)
+                    if job.future is not None and not job.future.done():
+                        job.future.set_result(None)
+                    await self._finish(job)
+                    return
+        # бот, которого уже нет в процессе, — отправляем через основного
+        bot, limiter = self._bots.get(job.payload.get("bot_id"), self._default)
+        await limiter.acquire(job.payload["chat_id"], cost(job.payload))
+        job.attempts += 1
+        try:
+            result = await call(bot, job.payload)
+        except TelegramRetryAfter as e:
+            job.flood_wait += e.retry_after
+            if job.flood_wait > self.max_flood_wait:
+                # чат (или его лимит) не отпускает — не держим место вечно
+                await self._fail(job, e)
+                await self._finish(job)
+                return
+            self.retried += 1
+            logger.warning(
+                "Flood control для %s: повтор через %s с", job.payload["chat_id"], e.retry_after
+            )
+            self._put_later(job, e.retry_after)
+            return
+        except (TelegramNetworkError, TelegramServerError, asyncio.TimeoutError) as e:
+            if job.attempts < self.max_attempts:
+                self.retried += 1
+                delay = self._backoff(job.attempts)
+                logger.warning(
+                    "Временная ошибка outbox (%r), попытка %s, повтор через %.1f с",
+                    e,
+                    job.attempts,
+                    delay,
+                )
+                self._put_later(job, delay)
+                return
+            await self._fail(job, e)
+            await self._finish(job)
+            return
+        except Exception as e:
+            await self._fail(job, e)
+            await self._finish(job)
+            return
+
+        self.sent += 1
+        if job.future is not None and not job.future.done():
+            job.future.set_result(result)
+        if job.tag:
+            for listener in self._listeners:
+                try:
+                    await listener(job.tag, result)
+                except Exception:
+                    logger.exception("Ошибка обработчика outbox для %s", job.tag)
+        await self._finish(job)
+
+    async def _fail(self, job: OutboxJob, error: Exception) -> None:
+        self.failed += 1
+        logger.warning(
+            "Не удалось выполнить %s для %s: %r", job.method, job.payload["chat_id"], error
+        )
+        if job.future is not None and not job.future.done():
+            job.future.set_exception(error)
+            job.future.exception()  # помечаем как полученное
+        if job.tag:
+            for listener in self._failure_listeners:
+                try:
+                    await listener(job.tag, error)
+                except Exception:
+                    logger.exception("Ошибка обработчика outbox для %s", job.tag)
@@ -0,0 +1,54 @@
+import re
+
+from .e164 import to_e164
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+def phone_key(phone: str) -> str:
+    """Единый ключ номера: E.164 (+79781234567); номера вне известных
+    правил (старые записи) — просто цифры."""
+    return to_e164(phone) or _NON_DIGITS.sub("", phone)
+
+
+class PhoneIndex:
+    """Индекс опубликованных кейсов по нормализованному номеру телефона.
+
+    Поиск — один lookup в dict, т.е. O(1) независимо от размера базы.
+    Для экономии памяти храним только id заявок; подробности берём из
+    хранилища по первичному ключу.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, list[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, phone: str, report_id: str) -> None:
+        key = phone_key(phone)
+        if not key:
+            return
+        ids = self._ids.setdefault(key, [])
+        if report_id not in ids:
+            ids.append(report_id)
+
+    def remove(self, phone: str, report_id: str) -> None:
+        key = phone_key(phone)
+        ids = self._ids.get(key)
+        if not ids or report_id not in ids:
+            return
+        ids.remove(report_id)
+        if not ids:
+            del self._ids[key]
+
+    def lookup(self, phone: str) -> list[str]:
+        return list(self._ids.get(phone_key(phone), ()))
+
+    def count(self, phone: str) -> int:
+        return len(self._ids.get(phone_key(phone), ()))
+
+    def bulk_load(self, rows) -> None:
+        """Заполняем индекс из пар (report_id, phone)."""
+        for report_id, phone in rows:
+            self.add(phone, report_id)
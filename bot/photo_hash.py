@@ -0,0 +1,150 @@
+import asyncio
+import io
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Hashable
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow — необязательная зависимость
+    Image = None
+
+HASH_SIZE = 8  # dHash 8x8 -> 64 бита
+
+
+def dhash(data: bytes, hash_size: int = HASH_SIZE) -> int:
+    """Разностный перцептивный хэш (dHash) картинки.
+
+    Устойчив к пересжатию, изменению размера и небольшой правке яркости:
+    у похожих картинок хэши отличаются в нескольких битах.
+    """
+    if Image is None:
+        raise RuntimeError("Для хэширования фото нужен Pillow: pip install Pillow")
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("L", (hash_size * 8, hash_size * 8))  # быстрое JPEG-декодирование
+        small = image.convert("L").resize(
+            (hash_size + 1, hash_size), Image.Resampling.LANCZOS
+        )
+        pixels = small.tobytes()
+
+    value = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """BK-дерево для поиска хэшей в пределах расстояния Хэмминга."""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self):
+        # узел: [хэш, список элементов, {расстояние: дочерний узел}]
+        self._root: list | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item: Hashable) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, Hashable]]:
+        """Все элементы с расстоянием ``<= max_distance``: (расстояние, элемент)."""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, item) for item in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            for edge, child in node[2].items():
+                if low <= edge <= high:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+def to_signed(value: int) -> int:
+    """64-битный хэш -> знаковое целое для INTEGER в SQLite."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class PhotoHashIndex:
+    """Индекс перцептивных хэшей фото из заявок.
+
+    Хэширование идёт в пуле потоков (или процессов, если передать
+    ``ProcessPoolExecutor``), так что event loop не блокируется.
+    Элементы индекса — пары (report_id, file_id).
+    """
+
+    def __init__(self, max_distance: int = 6, executor: Executor | None = None):
+        self.max_distance = max_distance
+        self._tree = BKTree()
+        self._items: set[tuple[str, str]] = set()
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="photo-hash"
+        )
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    async def hash_bytes(self, data: bytes) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, dhash, data)
+
+    def add(self, value: int, report_id: str, file_id: str) -> None:
+        item = (report_id, file_id)
+        if item in self._items:
+            return
+        self._items.add(item)
+        self._tree.add(value, item)
+
+    def bulk_load(self, rows) -> None:
+        """Заполняем индекс из троек (report_id, file_id, знаковый хэш из базы)."""
+        for report_id, file_id, value in rows:
+            self.add(to_unsigned(value), report_id, file_id)
+
+    def find_similar(
+        self, value: int, exclude_report: str | None = None
+    ) -> list[tuple[int, str, str]]:
+        """Похожие фото: (расстояние, report_id, file_id)."""
+        return [
+            (distance, report_id, file_id)
+            for distance, (report_id, file_id) in self._tree.search(value, self.max_distance)
+            if report_id != exclude_report
+        ]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Асинхронный token bucket: ``rate`` токенов в секунду, запас ``capacity``.
+
+    Ожидающие обслуживаются по очереди (FIFO), поэтому поток запросов
+    не «схлопывается» в пачку после паузы.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        """Запас полон и никто не ждёт — bucket можно выбросить."""
+        self._refill()
+        return self._tokens >= self.capacity and not self._lock.locked()
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        cost = min(cost, self.capacity)
+        async with self._lock:
+            self._refill()
+            if self._tokens < cost:
+                await asyncio.sleep((cost - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= cost
+
+
+class SendRateLimiter:
+    """Общий лимит исходящих сообщений бота плюс лимит на каждый чат.
+
+    По умолчанию соответствует ограничениям Telegram: около 30 сообщений
+    в секунду на бота и около одного сообщения в секунду в один чат.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        per_chat_rate: float = 1.0,
+        per_chat_burst: float = 3.0,
+        max_chats: int = 10_000,
+    ):
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_chats = max_chats
+        self._chats: dict[int | str, TokenBucket] = {}
+
+    def clone(self) -> "SendRateLimiter":
+        """Новый лимитер с теми же лимитами (лимиты Telegram — на каждого бота)."""
+        return SendRateLimiter(
+            self.global_bucket.rate,
+            self.per_chat_rate,
+            self.per_chat_burst,
+            self.max_chats,
+        )
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_chats:
+                self._prune()
+            bucket = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _prune(self) -> None:
+        for chat_id in [c for c, b in self._chats.items() if b.idle]:
+            del self._chats[chat_id]
+
+    async def acquire(self, chat_id: int | str, cost: float = 1.0) -> None:
+        """Ждём, пока можно отправить ``cost`` сообщений в ``chat_id``."""
+        # Сначала лимит чата, чтобы не занимать общий запас во время ожидания
+        await self._chat_bucket(chat_id).acquire(cost)
+        await self.global_bucket.acquire(cost)
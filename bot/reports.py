@@ -0,0 +1,848 @@
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from .stats import (
+    DIM_CITY,
+    DIM_COUNTRY,
+    DIM_DAY,
+    DIM_MODERATOR,
+    DIM_TOTAL,
+    DIM_TTM,
+    STATS_DAYS,
+    STATS_TOP,
+    decision_deltas,
+    expiry_deltas,
+    submit_deltas,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    user_username TEXT,
+    user_first_name TEXT,
+    country TEXT NOT NULL,
+    city TEXT NOT NULL,
+    guest_name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    description TEXT NOT NULL,
+    photo_ids TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    decided_at TEXT,
+    decided_by INTEGER,
+    bot_id INTEGER,
+    publish_claim TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_reports_phone ON reports (phone);
+CREATE INDEX IF NOT EXISTS ix_reports_user_id ON reports (user_id);
+CREATE INDEX IF NOT EXISTS ix_reports_place ON reports (country, city);
+CREATE INDEX IF NOT EXISTS ix_reports_created_at ON reports (created_at);
+CREATE INDEX IF NOT EXISTS ix_reports_status ON reports (status, created_at);
+
+CREATE TABLE IF NOT EXISTS report_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_id TEXT NOT NULL REFERENCES reports (id),
+    status TEXT NOT NULL,
+    actor_id INTEGER,
+    details TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_report_events_report ON report_events (report_id, id);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    priority INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    tag TEXT,
+    dedup_key TEXT,
+    owner TEXT,
+    lease_until REAL,
+    created_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_outbox_dedup ON outbox (dedup_key);
+
+CREATE TABLE IF NOT EXISTS photo_hashes (
+    report_id TEXT NOT NULL REFERENCES reports (id),
+    file_id TEXT NOT NULL,
+    hash INTEGER NOT NULL,
+    PRIMARY KEY (report_id, file_id)
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_lease ON outbox (lease_until);
+
+CREATE TABLE IF NOT EXISTS report_stats (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    submitted INTEGER NOT NULL DEFAULT 0,
+    approved INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    ttm_sum REAL NOT NULL DEFAULT 0,
+    expired INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS admin_messages (
+    report_id TEXT NOT NULL REFERENCES reports (id),
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (report_id, chat_id, message_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS scheduler_slots (
+    name TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    owner TEXT,
+    PRIMARY KEY (name, slot)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    source TEXT PRIMARY KEY,
+    byte_offset INTEGER NOT NULL,
+    last_message_id INTEGER,
+    imported INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+);
+"""
+
+# Колонки, добавленные после первой версии схемы: (таблица, колонка, тип)
+MIGRATIONS = (
+    ("outbox", "dedup_key", "TEXT"),
+    ("outbox", "owner", "TEXT"),
+    ("outbox", "lease_until", "REAL"),
+    ("report_stats", "expired", "INTEGER NOT NULL DEFAULT 0"),
+    ("reports", "bot_id", "INTEGER"),
+    ("reports", "publish_claim", "TEXT"),
+)
+
+# PRAGMA user_version, начиная с которой report_stats уже посчитана
+STATS_BACKFILLED = 1
+
+REPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "user_username",
+    "user_first_name",
+    "country",
+    "city",
+    "guest_name",
+    "phone",
+    "description",
+    "photo_ids",
+    "status",
+    "created_at",
+    "decided_at",
+    "decided_by",
+    # бот, через который подана заявка (NULL — бот по умолчанию)
+    "bot_id",
+)
+
+STATUS_PENDING = "pending"
+STATUS_APPROVED = "approved"
+STATUS_PUBLISHED = "published"
+STATUS_REJECTED = "rejected"
+# не рассмотрена вовремя и закрыта автоматически
+STATUS_EXPIRED = "expired"
+
+
+def _row_to_report(row: sqlite3.Row | None) -> dict | None:
+    if row is None:
+        return None
+    report = dict(row)
+    report["photo_ids"] = json.loads(report["photo_ids"])
+    return report
+
+
+class ReportStore:
+    """Хранилище заявок в SQLite (WAL) с асинхронным интерфейсом.
+
+    Все обращения к базе идут через один выделенный поток, поэтому
+    event loop не блокируется, а записи не конкурируют между собой.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="report-store"
+        )
+        self._conn: sqlite3.Connection | None = None
+
+    # --- служебное (выполняется в потоке хранилища) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._migrate(conn)
+            conn.executescript(SCHEMA)
+            self._backfill_stats(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        for table, column, column_type in MIGRATIONS:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if columns and column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    @staticmethod
+    def _bump_stats(conn: sqlite3.Connection, deltas: list[tuple]) -> None:
+        conn.executemany(
+            "INSERT INTO report_stats"
+            " (dimension, key, submitted, approved, rejected, ttm_sum, expired)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (dimension, key) DO UPDATE SET"
+            " submitted = submitted + excluded.submitted,"
+            " approved = approved + excluded.approved,"
+            " rejected = rejected + excluded.rejected,"
+            " ttm_sum = ttm_sum + excluded.ttm_sum,"
+            " expired = expired + excluded.expired",
+            deltas,
+        )
+
+    @classmethod
+    def _backfill_stats(cls, conn: sqlite3.Connection) -> None:
+        """Один раз считаем статистику по базе, созданной до report_stats.
+
+        Что посчитано, отмечаем в user_version: иначе архив, импортированный
+        до первого запуска бота, попал бы в статистику как одобренные заявки.
+        Архивные посты (channel_*) не считаем и здесь.
+        """
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= STATS_BACKFILLED:
+                return
+            conn.execute(f"PRAGMA user_version = {STATS_BACKFILLED}")
+            # база, где статистика уже велась до появления отметки
+            if conn.execute("SELECT 1 FROM report_stats LIMIT 1").fetchone():
+                return
+            for row in conn.execute(
+                "SELECT country, city, created_at, status, decided_at, decided_by"
+                " FROM reports WHERE id NOT LIKE 'channel\\_%' ESCAPE '\\'"
+            ).fetchall():
+                report = dict(row)
+                deltas = submit_deltas(report)
+                if report["status"] == STATUS_EXPIRED:
+                    deltas += expiry_deltas(report)
+                elif report["decided_at"] and report["status"] != STATUS_PENDING:
+                    deltas += decision_deltas(
+                        report, report["status"] != STATUS_REJECTED
+                    )
+                cls._bump_stats(conn, deltas)
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat()
+
+    def _add_event(
+        self,
+        conn: sqlite3.Connection,
+        report_id: str,
+        status: str,
+        actor_id: int | None,
+        details: dict | None,
+    ) -> None:
+        conn.execute(
+            "INSERT INTO report_events (report_id, status, actor_id, details, created_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (
+                report_id,
+                status,
+                actor_id,
+                json.dumps(details, ensure_ascii=False) if details else None,
+                self._now(),
+            ),
+        )
+
+    def _add_sync(self, report: dict) -> None:
+        conn = self._connect()
+        row = {column: report.get(column) for column in REPORT_COLUMNS}
+        row["photo_ids"] = json.dumps(report.get("photo_ids") or [])
+        row["status"] = report.get("status") or STATUS_PENDING
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"INSERT INTO reports ({', '.join(REPORT_COLUMNS)})"
+                f" VALUES ({', '.join('?' * len(REPORT_COLUMNS))})",
+                tuple(row[column] for column in REPORT_COLUMNS),
+            )
+            self._add_event(conn, row["id"], row["status"], row["user_id"], None)
+            self._bump_stats(conn, submit_deltas(row))
+
+    def _import_sync(
+        self,
+        reports: list[dict],
+        source: str,
+        byte_offset: int,
+        last_message_id: int | None,
+    ) -> int:
+        conn = self._connect()
+        imported = 0
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for report in reports:
+                # пост, опубликованный самим ботом, уже есть в базе
+                if conn.execute(
+                    "SELECT 1 FROM reports WHERE phone = ? AND guest_name = ?"
+                    " AND description = ?",
+                    (report["phone"], report["guest_name"], report["description"]),
+                ).fetchone():
+                    continue
+                row = {column: report.get(column) for column in REPORT_COLUMNS}
+                row["photo_ids"] = json.dumps(report.get("photo_ids") or [])
+                cur = conn.execute(
+                    f"INSERT OR IGNORE INTO reports ({', '.join(REPORT_COLUMNS)})"
+                    f" VALUES ({', '.join('?' * len(REPORT_COLUMNS))})",
+                    tuple(row[column] for column in REPORT_COLUMNS),
+                )
+                if cur.rowcount:
+                    # событие publish — чтобы запущенные процессы подхватили
+                    # кейс в индексы (см. published_after)
+                    self._add_event(
+                        conn, row["id"], STATUS_PUBLISHED, None, {"source": "import"}
+                    )
+                    imported += 1
+            conn.execute(
+                "INSERT INTO import_checkpoints"
+                " (source, byte_offset, last_message_id, imported, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (source) DO UPDATE SET"
+                " byte_offset = excluded.byte_offset,"
+                " last_message_id = excluded.last_message_id,"
+                " imported = imported + excluded.imported,"
+                " updated_at = excluded.updated_at",
+                (source, byte_offset, last_message_id, imported, self._now()),
+            )
+        return imported
+
+    def _add_admin_message_sync(
+        self, report_id: str, chat_id: int, message_id: int, text: str
+    ) -> None:
+        self._connect().execute(
+            "INSERT OR IGNORE INTO admin_messages (report_id, chat_id, message_id, text)"
+            " VALUES (?, ?, ?, ?)",
+            (report_id, chat_id, message_id, text),
+        )
+
+    def _admin_messages_sync(self, report_id: str) -> list[dict]:
+        conn = self._connect()
+        return [
+            dict(row)
+            for row in conn.execute(
+                "SELECT chat_id, message_id, text FROM admin_messages WHERE report_id = ?",
+                (report_id,),
+            )
+        ]
+
+    def _pending_sync(self) -> list[tuple[str, str]]:
+        conn = self._connect()
+        return [
+            tuple(row)
+            for row in conn.execute(
+                "SELECT id, created_at FROM reports WHERE status = ?",
+                (STATUS_PENDING,),
+            )
+        ]
+
+    def _pending_older_than_sync(
+        self, cutoff: str, limit: int, bot_id: int | None
+    ) -> tuple[int, list[dict]]:
+        conn = self._connect()
+        where = "status = ? AND created_at < ?"
+        params: tuple = (STATUS_PENDING, cutoff)
+        if bot_id is not None:
+            where += " AND bot_id = ?"
+            params += (bot_id,)
+        count = conn.execute(
+            f"SELECT COUNT(*) FROM reports WHERE {where}", params
+        ).fetchone()[0]
+        rows = self._query_sync(
+            f"SELECT * FROM reports WHERE {where} ORDER BY created_at LIMIT ?",
+            params + (limit,),
+        )
+        return count, rows
+
+    def _assign_bot_sync(self, bot_id: int) -> int:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return conn.execute(
+                "UPDATE reports SET bot_id = ? WHERE bot_id IS NULL", (bot_id,)
+            ).rowcount
+
+    def _claim_publish_sync(self, report_id: str, owner: str) -> bool:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return bool(
+                conn.execute(
+                    "UPDATE reports SET publish_claim = ?"
+                    " WHERE id = ? AND status = ?"
+                    " AND (publish_claim IS NULL OR publish_claim = ?)",
+                    (owner, report_id, STATUS_APPROVED, owner),
+                ).rowcount
+            )
+
+    def _release_publish_sync(self, report_id: str, owner: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE reports SET publish_claim = NULL"
+                " WHERE id = ? AND publish_claim = ?",
+                (report_id, owner),
+            )
+
+    def _claim_slot_sync(self, name: str, slot: int, owner: str) -> bool:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO scheduler_slots (name, slot, owner)"
+                " VALUES (?, ?, ?)",
+                (name, slot, owner),
+            )
+            conn.execute(
+                "DELETE FROM scheduler_slots WHERE name = ? AND slot < ?",
+                (name, slot - 100),
+            )
+        return bool(cur.rowcount)
+
+    def _checkpoint_sync(self, source: str) -> dict | None:
+        row = self._connect().execute(
+            "SELECT * FROM import_checkpoints WHERE source = ?", (source,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def _transition_sync(
+        self,
+        report_id: str,
+        from_status: str,
+        to_status: str,
+        actor_id: int | None,
+    ) -> dict | None:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "UPDATE reports SET status = ?, decided_at = COALESCE(decided_at, ?),"
+                " decided_by = COALESCE(decided_by, ?)"
+                " WHERE id = ? AND status = ?",
+                (to_status, self._now(), actor_id, report_id, from_status),
+            )
+            if cur.rowcount == 0:
+                return None
+            self._add_event(conn, report_id, to_status, actor_id, None)
+            row = conn.execute(
+                "SELECT * FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+            if from_status == STATUS_PENDING and to_status in (
+                STATUS_APPROVED,
+                STATUS_REJECTED,
+            ):
+                self._bump_stats(
+                    conn, decision_deltas(dict(row), to_status == STATUS_APPROVED)
+                )
+            elif from_status == STATUS_PENDING and to_status == STATUS_EXPIRED:
+                self._bump_stats(conn, expiry_deltas(dict(row)))
+        return _row_to_report(row)
+
+    def _event_sync(
+        self,
+        report_id: str,
+        status: str,
+        actor_id: int | None,
+        details: dict | None,
+    ) -> None:
+        conn = self._connect()
+        with conn:
+            self._add_event(conn, report_id, status, actor_id, details)
+
+    def _query_sync(self, sql: str, params: tuple) -> list[dict]:
+        conn = self._connect()
+        return [_row_to_report(row) for row in conn.execute(sql, params)]
+
+    def _history_sync(self, report_id: str) -> list[dict]:
+        conn = self._connect()
+        events = []
+        for row in conn.execute(
+            "SELECT status, actor_id, details, created_at FROM report_events"
+            " WHERE report_id = ? ORDER BY id",
+            (report_id,),
+        ):
+            event = dict(row)
+            event["details"] = json.loads(event["details"]) if event["details"] else None
+            events.append(event)
+        return events
+
+    def _outbox_add_sync(
+        self,
+        priority: int,
+        method: str,
+        payload: dict,
+        tag: dict | None,
+        dedup_key: str | None,
+        owner: str,
+        lease_until: float,
+    ) -> int | None:
+        conn = self._connect()
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO outbox"
+            " (priority, method, payload, tag, dedup_key, owner, lease_until, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                priority,
+                method,
+                json.dumps(payload, ensure_ascii=False),
+                json.dumps(tag, ensure_ascii=False) if tag else None,
+                dedup_key,
+                owner,
+                lease_until,
+                self._now(),
+            ),
+        )
+        return cur.lastrowid if cur.rowcount else None
+
+    def _outbox_delete_sync(self, job_id: int) -> None:
+        self._connect().execute("DELETE FROM outbox WHERE id = ?", (job_id,))
+
+    def _outbox_claim_sync(self, owner: str, now: float, lease_until: float) -> list[tuple]:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, priority, method, payload, tag FROM outbox"
+                " WHERE owner IS NULL OR lease_until IS NULL OR lease_until < ?"
+                " ORDER BY priority, id",
+                (now,),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET owner = ?, lease_until = ? WHERE id = ?",
+                [(owner, lease_until, row["id"]) for row in rows],
+            )
+        return [
+            (
+                row["id"],
+                row["priority"],
+                row["method"],
+                json.loads(row["payload"]),
+                json.loads(row["tag"]) if row["tag"] else None,
+            )
+            for row in rows
+        ]
+
+    def _outbox_renew_sync(self, owner: str, lease_until: float) -> None:
+        self._connect().execute(
+            "UPDATE outbox SET lease_until = ? WHERE owner = ?", (lease_until, owner)
+        )
+
+    def _outbox_release_sync(self, owner: str) -> None:
+        self._connect().execute(
+            "UPDATE outbox SET owner = NULL, lease_until = NULL WHERE owner = ?",
+            (owner,),
+        )
+
+    def _add_photo_hashes_sync(self, rows: list[tuple[str, str, int]]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO photo_hashes (report_id, file_id, hash)"
+                " VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def _photo_hashes_sync(self, after: int) -> list[tuple[int, str, str, int]]:
+        conn = self._connect()
+        return [
+            tuple(row)
+            for row in conn.execute(
+                "SELECT rowid, report_id, file_id, hash FROM photo_hashes"
+                " WHERE rowid > ? ORDER BY rowid",
+                (after,),
+            )
+        ]
+
+    def _published_after_sync(self, event_id: int) -> list[tuple]:
+        conn = self._connect()
+        return [
+            tuple(row)
+            for row in conn.execute(
+                "SELECT e.id, r.id, r.phone, r.guest_name FROM report_events e"
+                " JOIN reports r ON r.id = e.report_id"
+                " WHERE e.id > ? AND e.status = ? ORDER BY e.id",
+                (event_id, STATUS_PUBLISHED),
+            )
+        ]
+
+    def _stats_sync(self, since_day: str) -> dict:
+        conn = self._connect()
+
+        def rows(sql: str, params: tuple) -> list[dict]:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+        top = (
+            "SELECT * FROM report_stats WHERE dimension = ?"
+            " ORDER BY {} DESC LIMIT ?"
+        )
+        total = rows("SELECT * FROM report_stats WHERE dimension = ?", (DIM_TOTAL,))
+        return {
+            DIM_TOTAL: total[0] if total else None,
+            DIM_COUNTRY: rows(top.format("submitted"), (DIM_COUNTRY, STATS_TOP)),
+            DIM_CITY: rows(top.format("submitted"), (DIM_CITY, STATS_TOP)),
+            DIM_MODERATOR: rows(
+                top.format("approved + rejected"), (DIM_MODERATOR, STATS_TOP)
+            ),
+            DIM_DAY: rows(
+                "SELECT * FROM report_stats WHERE dimension = ? AND key >= ?"
+                " ORDER BY key",
+                (DIM_DAY, since_day),
+            ),
+            DIM_TTM: rows(
+                "SELECT * FROM report_stats WHERE dimension = ? ORDER BY key",
+                (DIM_TTM,),
+            ),
+        }
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- публичный интерфейс ---
+
+    async def add(self, report: dict) -> None:
+        """Сохраняем новую заявку (по умолчанию — в статусе pending)."""
+        await self._run(self._add_sync, report)
+
+    async def get(self, report_id: str) -> dict | None:
+        rows = await self._run(
+            self._query_sync, "SELECT * FROM reports WHERE id = ?", (report_id,)
+        )
+        return rows[0] if rows else None
+
+    async def transition(
+        self,
+        report_id: str,
+        from_status: str,
+        to_status: str,
+        actor_id: int | None = None,
+    ) -> dict | None:
+        """Атомарно меняем статус заявки.
+
+        Возвращает заявку, если она была в статусе ``from_status``,
+        иначе ``None`` (уже обработана или не существует).
+        """
+        return await self._run(
+            self._transition_sync, report_id, from_status, to_status, actor_id
+        )
+
+    async def add_admin_message(
+        self, report_id: str, chat_id: int, message_id: int, text: str
+    ) -> None:
+        """Запоминаем сообщение с кнопками модерации, отправленное админу."""
+        await self._run(self._add_admin_message_sync, report_id, chat_id, message_id, text)
+
+    async def admin_messages(self, report_id: str) -> list[dict]:
+        """Копии заявки у админов: chat_id, message_id и текст (HTML)."""
+        return await self._run(self._admin_messages_sync, report_id)
+
+    async def pending(self) -> list[tuple[str, str]]:
+        """Все заявки на модерации: пары (id, created_at)."""
+        return await self._run(self._pending_sync)
+
+    async def pending_older_than(
+        self, cutoff: str, limit: int = 10, bot_id: int | None = None
+    ) -> tuple[int, list[dict]]:
+        """Сколько заявок ждут модерации с момента до ``cutoff`` и самые
+        старые из них (не больше ``limit``); ``bot_id`` — только одного бота."""
+        return await self._run(self._pending_older_than_sync, cutoff, limit, bot_id)
+
+    async def assign_bot(self, bot_id: int) -> int:
+        """Заявки без бота (поданные до многоботового режима) закрепляем
+        за ``bot_id``. Возвращает число таких заявок."""
+        return await self._run(self._assign_bot_sync, bot_id)
+
+    async def claim_publish(self, report_id: str, owner: str) -> bool:
+        """Перед отправкой в канал: одобренную заявку публикует ``owner``.
+
+        Отметка ставится до отправки, поэтому после падения процесса
+        посреди отправки другой владелец (в т.ч. тот же процесс после
+        перезапуска) её не повторит: лучше без поста, чем два поста.
+        Тот же владелец может повторять отправку сколько угодно.
+        """
+        return await self._run(self._claim_publish_sync, report_id, owner)
+
+    async def release_publish(self, report_id: str, owner: str) -> None:
+        """Отправка точно не удалась — снимаем отметку ``owner``."""
+        await self._run(self._release_publish_sync, report_id, owner)
+
+    async def claim_slot(self, name: str, slot: int, owner: str) -> bool:
+        """Периодическое действие ``name`` в интервале ``slot`` выполняет
+        только один процесс: первый, кто его займёт."""
+        return await self._run(self._claim_slot_sync, name, slot, owner)
+
+    async def import_published(
+        self,
+        reports: list[dict],
+        source: str,
+        byte_offset: int,
+        last_message_id: int | None,
+    ) -> int:
+        """Пачка архивных кейсов одной транзакцией вместе с отметкой,
+        до какого места файла ``source`` импорт дошёл. Возвращает число
+        добавленных (уже известные кейсы пропускаются).
+        """
+        return await self._run(
+            self._import_sync, reports, source, byte_offset, last_message_id
+        )
+
+    async def import_checkpoint(self, source: str) -> dict | None:
+        return await self._run(self._checkpoint_sync, source)
+
+    async def add_event(
+        self,
+        report_id: str,
+        status: str,
+        actor_id: int | None = None,
+        details: dict | None = None,
+    ) -> None:
+        """Пишем в историю заявки событие, не меняя её статус."""
+        await self._run(self._event_sync, report_id, status, actor_id, details)
+
+    async def get_many(self, report_ids: list[str]) -> list[dict]:
+        """Заявки по списку id (в порядке убывания даты)."""
+        if not report_ids:
+            return []
+        placeholders = ", ".join("?" * len(report_ids))
+        return await self._run(
+            self._query_sync,
+            f"SELECT * FROM reports WHERE id IN ({placeholders})"
+            " ORDER BY created_at DESC",
+            tuple(report_ids),
+        )
+
+    async def history(self, report_id: str) -> list[dict]:
+        return await self._run(self._history_sync, report_id)
+
+    async def find_by_phone(self, phone: str, limit: int = 50) -> list[dict]:
+        return await self._run(
+            self._query_sync,
+            "SELECT * FROM reports WHERE phone = ? ORDER BY created_at DESC LIMIT ?",
+            (phone, limit),
+        )
+
+    async def find_by_user(self, user_id: int, limit: int = 50) -> list[dict]:
+        return await self._run(
+            self._query_sync,
+            "SELECT * FROM reports WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit),
+        )
+
+    async def find_by_place(
+        self, country: str, city: str | None = None, limit: int = 50
+    ) -> list[dict]:
+        if city is None:
+            return await self._run(
+                self._query_sync,
+                "SELECT * FROM reports WHERE country = ?"
+                " ORDER BY created_at DESC LIMIT ?",
+                (country, limit),
+            )
+        return await self._run(
+            self._query_sync,
+            "SELECT * FROM reports WHERE country = ? AND city = ?"
+            " ORDER BY created_at DESC LIMIT ?",
+            (country, city, limit),
+        )
+
+    async def find_by_status(self, status: str, limit: int = 50) -> list[dict]:
+        return await self._run(
+            self._query_sync,
+            "SELECT * FROM reports WHERE status = ? ORDER BY created_at LIMIT ?",
+            (status, limit),
+        )
+
+    async def published_after(self, event_id: int) -> list[tuple[int, str, str, str]]:
+        """Публикации после события ``event_id``: (event_id, id, phone, guest_name).
+
+        Позволяет процессам дополнять свои индексы в памяти публикациями,
+        сделанными другими процессами.
+        """
+        return await self._run(self._published_after_sync, event_id)
+
+    async def add_photo_hashes(self, rows: list[tuple[str, str, int]]) -> None:
+        """Сохраняем хэши фото: тройки (report_id, file_id, знаковый хэш)."""
+        await self._run(self._add_photo_hashes_sync, rows)
+
+    async def photo_hashes(self, after: int = 0) -> list[tuple[int, str, str, int]]:
+        """Хэши, добавленные после ``after``: (rowid, report_id, file_id, хэш)."""
+        return await self._run(self._photo_hashes_sync, after)
+
+    async def stats(self) -> dict:
+        """Снимок счётчиков для /stats (см. stats.render_stats).
+
+        Читает только готовые сводки — десятки строк независимо от
+        числа заявок.
+        """
+        since = datetime.now().date().toordinal() - STATS_DAYS + 1
+        since_day = datetime.fromordinal(since).strftime("%Y-%m-%d")
+        return await self._run(self._stats_sync, since_day)
+
+    # --- журнал исходящих сообщений (см. outbox.Outbox) ---
+
+    async def outbox_add(
+        self,
+        priority: int,
+        method: str,
+        payload: dict,
+        tag: dict | None,
+        dedup_key: str | None,
+        owner: str,
+        lease_until: float,
+    ) -> int | None:
+        """Записываем задание; ``None``, если задание с таким ``dedup_key`` уже есть."""
+        return await self._run(
+            self._outbox_add_sync,
+            priority,
+            method,
+            payload,
+            tag,
+            dedup_key,
+            owner,
+            lease_until,
+        )
+
+    async def outbox_delete(self, job_id: int) -> None:
+        await self._run(self._outbox_delete_sync, job_id)
+
+    async def outbox_claim(
+        self, owner: str, now: float, lease_until: float
+    ) -> list[tuple]:
+        """Забираем себе ничьи и просроченные задания (например, упавшего
+        процесса) и возвращаем только что забранные."""
+        return await self._run(self._outbox_claim_sync, owner, now, lease_until)
+
+    async def outbox_renew(self, owner: str, lease_until: float) -> None:
+        await self._run(self._outbox_renew_sync, owner, lease_until)
+
+    async def outbox_release(self, owner: str) -> None:
+        await self._run(self._outbox_release_sync, owner)
+
+    async def close(self) -> None:
+        await self._run(self._close_sync)
+        self._executor.shutdown(wait=True)
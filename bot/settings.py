@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import signal
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from dotenv import dotenv_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL = "@blacklistguests"
+
+
+class Settings(NamedTuple):
+    """Настройки, которые меняются без перезапуска (правкой .env или TENANTS_FILE)."""
+
+    admin_ids: frozenset[int]
+    channel_username: str
+
+
+def parse_ids(value: str) -> frozenset[int]:
+    return frozenset(int(x) for x in value.split(",") if x.strip())
+
+
+def read_settings(env_file: Path, process_env: dict[str, str]) -> Settings:
+    """Снимок из .env; переменные окружения процесса, как и при старте,
+    важнее файла."""
+    env = {**dotenv_values(env_file), **process_env}
+    return Settings(
+        admin_ids=parse_ids(env.get("ADMIN_IDS") or ""),
+        channel_username=env.get("CHANNEL_USERNAME") or DEFAULT_CHANNEL,
+    )
+
+
+class LiveSettings:
+    """Текущий снимок настроек с перезагрузкой по SIGHUP или по mtime файла.
+
+    Снимок неизменяемый. Перезагрузка собирает новый целиком и подменяет
+    ссылку одним присваиванием, поэтому читать ``current`` можно без
+    блокировок, а апдейт, который уже взял снимок, дорабатывает со старым.
+    Если файл не разобрался, остаётся прежний снимок.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Settings],
+        path: Path | None = None,
+        watch_interval: float = 0.0,
+    ):
+        self.loader = loader
+        self.path = path
+        self.watch_interval = watch_interval
+        self.current = loader()
+        self.reloads = 0
+        self._mtime = self._file_mtime()
+        self._listeners: list[Callable[[Settings, Settings], None]] = []
+        self._task: asyncio.Task | None = None
+
+    def _file_mtime(self) -> int | None:
+        if self.path is None:
+            return None
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def on_reload(self, listener: Callable[[Settings, Settings], None]) -> None:
+        """listener(старый, новый) — вызывается после подмены снимка."""
+        self._listeners.append(listener)
+
+    def reload(self) -> bool:
+        try:
+            new = self.loader()
+        except Exception:
+            logger.exception("Не удалось перечитать настройки, оставляем прежние")
+            return False
+        old = self.current
+        if new == old:
+            return False
+        self.current = new
+        self.reloads += 1
+        if old.admin_ids != new.admin_ids:
+            logger.info(
+                "Админы: +%s -%s",
+                sorted(new.admin_ids - old.admin_ids),
+                sorted(old.admin_ids - new.admin_ids),
+            )
+            if not new.admin_ids:
+                logger.warning("Список админов пуст")
+        if old.channel_username != new.channel_username:
+            logger.info("Канал: %s -> %s", old.channel_username, new.channel_username)
+        for listener in self._listeners:
+            try:
+                listener(old, new)
+            except Exception:
+                logger.exception("Ошибка обработчика перезагрузки настроек")
+        return True
+
+    async def start(self) -> None:
+        """Следим за mtime файла (SIGHUP — см. reload_on_sighup)."""
+        if self.path is not None and self.watch_interval > 0:
+            self._task = asyncio.create_task(self._watch(), name="settings-watch")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            mtime = self._file_mtime()
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self.reload()
+
+
+def reload_on_sighup(settings: list[LiveSettings]) -> None:
+    """По SIGHUP перечитываем все снимки процесса."""
+    def reload_all() -> None:
+        for live in settings:
+            live.reload()
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_all)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # нет SIGHUP (Windows) или цикл не в главном потоке
+        pass
+
+
+def stop_reload_on_sighup() -> None:
+    try:
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass
+
+
+def forward_sighup(pids: Callable[[], list[int]]) -> None:
+    """SIGHUP входного процесса пересылаем воркерам (у каждого свой снимок)."""
+    def handler(signum, frame):
+        for pid in pids():
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGHUP, handler)
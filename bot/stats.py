@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+from html import escape
+
+# Срез статистики -> ключ. Каждая строка report_stats хранит счётчики
+# submitted/approved/rejected/expired и сумму времени до решения (ttm_sum, сек).
+DIM_TOTAL = "total"
+DIM_COUNTRY = "country"
+DIM_CITY = "city"
+DIM_DAY = "day"
+DIM_MODERATOR = "moderator"
+DIM_TTM = "ttm"
+
+# Корзины гистограммы времени до решения: (верхняя граница, подпись)
+TTM_BUCKETS = (
+    (60, "до 1 мин"),
+    (5 * 60, "до 5 мин"),
+    (15 * 60, "до 15 мин"),
+    (3600, "до 1 ч"),
+    (6 * 3600, "до 6 ч"),
+    (24 * 3600, "до 1 сут"),
+    (float("inf"), "больше суток"),
+)
+
+STATS_DAYS = 14
+STATS_TOP = 10
+BAR_WIDTH = 12
+
+
+def ttm_bucket(seconds: float) -> str:
+    """Номер корзины строкой: ключи сортируются так же, как корзины."""
+    for index, (bound, _) in enumerate(TTM_BUCKETS):
+        if seconds <= bound:
+            return str(index)
+    return str(len(TTM_BUCKETS) - 1)
+
+
+def submit_deltas(report: dict) -> list[tuple]:
+    """Строки (dimension, key, submitted, approved, rejected, ttm_sum,
+    expired) для новой заявки."""
+    created = report["created_at"]
+    return [
+        (dimension, key, 1, 0, 0, 0.0, 0)
+        for dimension, key in (
+            (DIM_TOTAL, ""),
+            (DIM_COUNTRY, report["country"]),
+            (DIM_CITY, f"{report['country']} / {report['city']}"),
+            (DIM_DAY, created[:10]),
+        )
+    ]
+
+
+def decision_deltas(report: dict, approved: bool) -> list[tuple]:
+    """Строки для решения модератора. День — день подачи заявки, поэтому
+    доля одобренных по дням считается по когорте поданных в этот день."""
+    ttm = max(
+        0.0,
+        (
+            datetime.fromisoformat(report["decided_at"])
+            - datetime.fromisoformat(report["created_at"])
+        ).total_seconds(),
+    )
+    a, r = (1, 0) if approved else (0, 1)
+    return [
+        (DIM_TOTAL, "", 0, a, r, ttm, 0),
+        (DIM_COUNTRY, report["country"], 0, a, r, ttm, 0),
+        (DIM_CITY, f"{report['country']} / {report['city']}", 0, a, r, ttm, 0),
+        (DIM_DAY, report["created_at"][:10], 0, a, r, ttm, 0),
+        (DIM_MODERATOR, str(report["decided_by"]), 0, a, r, ttm, 0),
+        (DIM_TTM, ttm_bucket(ttm), 0, a, r, ttm, 0),
+    ]
+
+
+def expiry_deltas(report: dict) -> list[tuple]:
+    """Строки для заявки, закрытой без решения (в долю одобренных и время
+    до решения не входит)."""
+    return [
+        (dimension, key, 0, 0, 0, 0.0, 1)
+        for dimension, key in (
+            (DIM_TOTAL, ""),
+            (DIM_COUNTRY, report["country"]),
+            (DIM_CITY, f"{report['country']} / {report['city']}"),
+            (DIM_DAY, report["created_at"][:10]),
+        )
+    ]
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f} с"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} мин"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} ч"
+    return f"{seconds / 86400:.1f} сут"
+
+
+def _bar(value: int, peak: int) -> str:
+    if not peak:
+        return ""
+    return "█" * max(1 if value else 0, round(value / peak * BAR_WIDTH))
+
+
+def _rate(row: dict) -> str:
+    decided = row["approved"] + row["rejected"]
+    return f"{row['approved'] / decided:.0%}" if decided else "—"
+
+
+def _avg_ttm(row: dict) -> str:
+    decided = row["approved"] + row["rejected"]
+    return _duration(row["ttm_sum"] / decided) if decided else "—"
+
+
+def render_stats(snapshot: dict, today: str | None = None) -> str:
+    """Текст /stats (HTML) из снимка ReportStore.stats()."""
+    total = snapshot[DIM_TOTAL]
+    if total is None or not total["submitted"]:
+        return "Заявок пока нет."
+
+    closed = total["approved"] + total["rejected"] + total["expired"]
+    lines = [
+        "📊 <b>Статистика</b>",
+        "",
+        f"Заявок: {total['submitted']}, одобрено: {total['approved']}, "
+        f"отклонено: {total['rejected']}, просрочено: {total['expired']}, "
+        f"ждут: {total['submitted'] - closed}",
+        f"Доля одобренных: {_rate(total)}, "
+        f"среднее время до решения: {_avg_ttm(total)}",
+    ]
+
+    def table(title: str, rows: list[dict]) -> None:
+        if not rows:
+            return
+        lines.extend(["", f"<b>{title}</b>"])
+        for row in rows:
+            lines.append(
+                f"• {escape(row['key'])} — {row['submitted']}"
+                f" (одобрено {_rate(row)})"
+            )
+
+    table("Страны", snapshot[DIM_COUNTRY])
+    table("Города", snapshot[DIM_CITY])
+
+    moderators = snapshot[DIM_MODERATOR]
+    if moderators:
+        lines.extend(["", "<b>Модераторы</b>"])
+        for row in moderators:
+            lines.append(
+                f"• <code>{escape(row['key'])}</code> — одобрил {row['approved']},"
+                f" отклонил {row['rejected']}, в среднем {_avg_ttm(row)}"
+            )
+
+    # заявки по дням: пустые дни тоже показываем
+    today = datetime.fromisoformat(today) if today else datetime.now()
+    by_day = {row["key"]: row["submitted"] for row in snapshot[DIM_DAY]}
+    days = [
+        (today - timedelta(days=i)).strftime("%Y-%m-%d")
+        for i in range(STATS_DAYS - 1, -1, -1)
+    ]
+    peak = max((by_day.get(day, 0) for day in days), default=0)
+    lines.extend(["", f"<b>Заявки за {STATS_DAYS} дней</b>", "<pre>"])
+    for day in days:
+        count = by_day.get(day, 0)
+        lines.append(f"{day[5:]} {_bar(count, peak):<{BAR_WIDTH}} {count}")
+    lines.append("</pre>")
+
+    by_bucket = {
+        int(row["key"]): row["approved"] + row["rejected"]
+        for row in snapshot[DIM_TTM]
+    }
+    if by_bucket:
+        peak = max(by_bucket.values())
+        lines.extend(["", "<b>Время до решения</b>", "<pre>"])
+        for index, (_, label) in enumerate(TTM_BUCKETS):
+            count = by_bucket.get(index, 0)
+            lines.append(f"{label:<12} {_bar(count, peak):<{BAR_WIDTH}} {count}")
+        lines.append("</pre>")
+
+    return "\n".join(lines)
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+
+class SubscriptionCache:
+    """Кэш результатов проверки подписки с раздельными TTL.
+
+    Положительный ответ живёт дольше отрицательного: пользователь, который
+    только что подписался, не должен долго ждать, пока «нет» протухнет.
+    Параллельные проверки одного пользователя склеиваются в один запрос.
+    """
+
+    def __init__(
+        self,
+        positive_ttl: float = 300.0,
+        negative_ttl: float = 15.0,
+        max_size: int = 10_000,
+    ):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        # ключ пользователя -> (подписан?, момент истечения); порядок = LRU
+        self._entries: OrderedDict[Hashable, tuple[bool, float]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, user_id: Hashable) -> bool | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return value
+
+    def set(self, user_id: Hashable, value: bool) -> None:
+        ttl = self.positive_ttl if value else self.negative_ttl
+        self._entries[user_id] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Hashable) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def check(
+        self,
+        user_id: Hashable,
+        fetch: Callable[[], Awaitable[bool]],
+    ) -> bool:
+        """Возвращаем ответ из кэша или делаем (один на пользователя) запрос."""
+        cached = self.get(user_id)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        future = self._inflight.get(user_id)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # ошибки не кэшируем, но ждущие получают то же исключение
+            future.set_exception(e)
+            future.exception()  # помечаем как полученное
+            raise
+        else:
+            self.set(user_id, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(user_id, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+        }
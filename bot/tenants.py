@@ -0,0 +1,101 @@
+"""Несколько ботов (регионов) в одном процессе.
+
+Файл TENANTS_FILE — JSON-список ботов:
+
+    [
+      {"name": "ru", "token": "123:AAA…", "channel": "@blacklistguests",
+       "admin_ids": [111, 222], "countries_file": "countries_ru.json"},
+      {"name": "kz", "token": "456:BBB…", "channel": "@blacklistguests_kz",
+       "admin_ids": [333], "countries_file": "countries_kz.json"}
+    ]
+
+Путь к файлу стран считается от каталога TENANTS_FILE. Канал и админы
+перечитываются без перезапуска (как ADMIN_IDS из .env), токены — нет.
+Без TENANTS_FILE работает один бот из BOT_TOKEN / CHANNEL_USERNAME / ADMIN_IDS.
+"""
+import json
+from pathlib import Path
+
+from aiogram.utils.token import extract_bot_id
+
+from .countries import CountryList, default_countries
+from .settings import DEFAULT_CHANNEL, LiveSettings, Settings
+
+
+class Tenant:
+    """Один бот: свой токен, канал, админы и список стран."""
+
+    def __init__(
+        self,
+        name: str,
+        token: str | None,
+        settings: LiveSettings,
+        countries: CountryList,
+    ):
+        self.name = name
+        self.token = token
+        # без токена (импорт, бенчмарки) бот неизвестен
+        self.bot_id = extract_bot_id(token) if token else None
+        self.settings = settings
+        self.countries = countries
+
+
+def read_tenants_file(path: Path) -> list[dict]:
+    with path.open("r", encoding="utf-8") as f:
+        entries = json.load(f)
+    names = [entry["name"] for entry in entries]
+    if not entries or len(set(names)) != len(names):
+        raise ValueError(f"{path}: нужен непустой список ботов с разными name")
+    return entries
+
+
+def read_tenant_settings(path: Path, name: str) -> Settings:
+    for entry in read_tenants_file(path):
+        if entry["name"] == name:
+            return Settings(
+                admin_ids=frozenset(int(x) for x in entry.get("admin_ids", ())),
+                channel_username=entry.get("channel") or DEFAULT_CHANNEL,
+            )
+    raise ValueError(f"{path}: бот {name} пропал из файла")
+
+
+def load_tenants(path: Path, watch_interval: float = 0.0) -> list[Tenant]:
+    tenants = []
+    for entry in read_tenants_file(path):
+        name = entry["name"]
+        countries_file = entry.get("countries_file")
+        tenants.append(
+            Tenant(
+                name,
+                entry["token"],
+                LiveSettings(
+                    lambda name=name: read_tenant_settings(path, name),
+                    path=path,
+                    watch_interval=watch_interval,
+                ),
+                CountryList(path.parent / countries_file)
+                if countries_file
+                else default_countries,
+            )
+        )
+    return tenants
+
+
+class TenantRegistry:
+    """Боты процесса по id. Первый — бот по умолчанию: ему достаются
+    заявки, у которых бот не записан (поданные до многоботового режима)."""
+
+    def __init__(self, tenants: list[Tenant]):
+        self.default = tenants[0]
+        self._by_bot_id = {tenant.bot_id: tenant for tenant in tenants}
+        if len(self._by_bot_id) != len(tenants):
+            raise ValueError("Один и тот же токен указан для нескольких ботов")
+
+    def __iter__(self):
+        return iter(self._by_bot_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_bot_id)
+
+    def get(self, bot_id: int | None) -> Tenant:
+        return self._by_bot_id.get(bot_id, self.default)
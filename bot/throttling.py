@@ -0,0 +1,109 @@
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+KIND_CALLBACK = "callback"
+KIND_TEXT = "text"
+KIND_PHOTO = "photo"
+
+# Ответ на отброшенное нажатие кнопки: без него кнопка крутится до таймаута
+THROTTLED_CALLBACK_TEXT = "Слишком часто, подождите немного"
+
+
+def update_kind(update: Update) -> str | None:
+    """К какому лимиту относится апдейт (None — не ограничиваем)."""
+    if update.callback_query is not None:
+        return KIND_CALLBACK
+    message = update.message
+    if message is None:
+        return None
+    if message.photo:
+        return KIND_PHOTO
+    return KIND_TEXT
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Ограничение частоты апдейтов от одного пользователя.
+
+    Для каждой пары (пользователь, вид апдейта) — token bucket: ``rate``
+    апдейтов в секунду с запасом ``burst``. Лишние апдейты отбрасываются
+    до FSM-хранилища и хендлеров; сообщения — молча, на нажатия кнопок
+    отвечаем коротким уведомлением. Состояние — два числа на пару
+    в LRU-словаре на ``max_users`` записей, так что память ограничена.
+
+    ``exempt(bot_id, user_id)`` — кого не ограничиваем (админов бота,
+    через который пришёл апдейт).
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, tuple[float, float]],
+        max_users: int = 50000,
+        exempt: Callable[[int | None, int], bool] = lambda bot_id, user_id: False,
+    ):
+        self.limits = limits
+        self.max_users = max_users
+        self.exempt = exempt
+        # (user_id, вид) -> [остаток токенов, время последнего пополнения]
+        self._buckets: OrderedDict[tuple[int, str], list[float]] = OrderedDict()
+        self.passed = 0
+        self.dropped: Counter[str] = Counter()
+
+    def allow(self, user_id: int, kind: str, now: float | None = None) -> bool:
+        rate, burst = self.limits[kind]
+        now = time.monotonic() if now is None else now
+        key = (user_id, kind)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        kind = update_kind(event)
+        bot = data.get("bot")
+        if (
+            user is not None
+            and kind in self.limits
+            and not self.exempt(bot.id if bot else None, user.id)
+            and not self.allow(user.id, kind)
+        ):
+            self.dropped[kind] += 1
+            if event.callback_query is not None:
+                try:
+                    await event.callback_query.answer(THROTTLED_CALLBACK_TEXT)
+                except Exception:
+                    logger.debug(
+                        "Не удалось ответить на отброшенный callback", exc_info=True
+                    )
+            return None
+        self.passed += 1
+        return await handler(event, data)
+
+    def install(self, dispatcher: Dispatcher) -> None:
+        """Ставим перед FSM-middleware диспетчера, чтобы отброшенный апдейт
+        не читал состояние из хранилища."""
+        outer = dispatcher.update.outer_middleware
+        outer.unregister(dispatcher.fsm)
+        outer(self)
+        outer(dispatcher.fsm)
@@ -0,0 +1,220 @@
+import asyncio
+import hmac
+import json
+import logging
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def update_shard_key(raw: dict) -> int:
+    """Ключ для распределения апдейтов по воркерам.
+
+    Апдейты одного пользователя всегда попадают в один и тот же воркер,
+    поэтому шаги FSM обрабатываются строго по порядку.
+    """
+    for key, value in raw.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        user = value.get("from") or value.get("user")
+        if user:
+            return user["id"]
+        chat = value.get("chat")
+        if chat:
+            return chat["id"]
+    return raw.get("update_id", 0)
+
+
+class WebhookServer:
+    """aiohttp-сервер вебхука: проверяет секрет, быстро отвечает Telegram
+    и раздаёт апдейты пулу воркеров, чтобы медленный хендлер не тормозил приём.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret: str | None,
+        path: str = "/webhook",
+        workers: int = 8,
+        queue_size: int = 1000,
+        **workflow_data: Any,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.secret = secret
+        self.path = path
+        self.workflow_data = workflow_data
+        # очередь на каждый воркер: порядок внутри одного пользователя сохраняется
+        self._queues: list[asyncio.Queue] = [
+            asyncio.Queue(maxsize=max(1, queue_size // workers)) for _ in range(workers)
+        ]
+        self._tasks: list[asyncio.Task] = []
+        self.received = 0
+        self.processed = 0
+        self.rejected = 0
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_shutdown.append(self._on_shutdown)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret is not None and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self.secret
+        ):
+            self.rejected += 1
+            return web.Response(status=401)
+
+        try:
+            raw = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        self.received += 1
+        queue = self._queues[update_shard_key(raw) % len(self._queues)]
+        # если воркеры не успевают — ждём места (Telegram сам притормозит)
+        await queue.put(raw)
+        return web.Response()
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            raw = await queue.get()
+            try:
+                update = Update.model_validate(raw, context={"bot": self.bot})
+                await self.dispatcher.feed_update(self.bot, update, **self.workflow_data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка при обработке апдейта %s", raw.get("update_id"))
+            finally:
+                self.processed += 1
+                queue.task_done()
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._tasks = [
+            asyncio.create_task(self._worker(queue), name=f"webhook-worker-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+
+    async def _on_shutdown(self, app: web.Application) -> None:
+        # даём доработать уже принятым апдейтам
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+async def run_webhook(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    url: str | None,
+    secret: str | None,
+    host: str,
+    port: int,
+    path: str = "/webhook",
+    workers: int = 8,
+    queue_size: int = 1000,
+) -> None:
+    """Регистрируем вебхук в Telegram и обслуживаем его до остановки.
+
+    Без ``url`` вебхук в Telegram не регистрируется — так работают
+    процессы-воркеры за ``run_ingress``.
+    """
+    server = WebhookServer(
+        dispatcher, bot, secret, path=path, workers=workers, queue_size=queue_size
+    )
+    runner = web.AppRunner(server.make_app())
+    await runner.setup()
+
+    await dispatcher.emit_startup(bot=bot, dispatcher=dispatcher)
+    if url:
+        await bot.set_webhook(
+            url=url.rstrip("/") + path,
+            secret_token=secret,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+        )
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("Вебхук слушает %s:%s%s", host, port, path)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await dispatcher.emit_shutdown(bot=bot, dispatcher=dispatcher)
+        await bot.session.close()
+
+
+async def run_ingress(
+    bot: Bot,
+    url: str,
+    secret: str | None,
+    host: str,
+    port: int,
+    worker_urls: list[str],
+    allowed_updates: list[str],
+    path: str = "/webhook",
+) -> None:
+    """Входной процесс для режима с несколькими процессами-воркерами.
+
+    Принимает вебхук Telegram и пересылает апдейт воркеру, выбранному по
+    пользователю: все апдейты одного пользователя (и его FSM-сессия)
+    живут в одном процессе, а модерация расходится по всем процессам.
+    """
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=100)
+    )
+
+    async def handle(request: web.Request) -> web.Response:
+        if secret is not None and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), secret
+        ):
+            return web.Response(status=401)
+        body = await request.read()
+        try:
+            raw = json.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+
+        worker_url = worker_urls[update_shard_key(raw) % len(worker_urls)]
+        try:
+            async with session.post(
+                worker_url, data=body, headers={"Content-Type": "application/json"}
+            ) as resp:
+                return web.Response(status=resp.status)
+        except aiohttp.ClientError:
+            # воркер недоступен — Telegram повторит доставку позже
+            logger.warning("Воркер %s недоступен", worker_url)
+            return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_post(path, handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+
+    await bot.set_webhook(
+        url=url.rstrip("/") + path,
+        secret_token=secret,
+        allowed_updates=allowed_updates,
+    )
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(
+        "Входной вебхук слушает %s:%s%s, воркеров: %s", host, port, path, len(worker_urls)
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await session.close()
+        await bot.session.close()
@@ -1,22 +1,205 @@
 import asyncio
+import logging
+import multiprocessing
+import signal
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 
-from bot.config import BOT_TOKEN
+from bot.config import (
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_WORKERS,
+    WEBHOOK_QUEUE_SIZE,
+    FSM_DB,
+    FSM_FLUSH_INTERVAL,
+    FSM_SESSION_TTL,
+    WORKER_PROCESSES,
+    WORKER_BASE_PORT,
+    METRICS_PORT,
+    METRICS_HOST,
+    METRICS_PROFILER,
+    THROTTLING,
+    HTTP_POOL_LIMIT,
+)
+from bot.fsm_storage import SQLiteStorage
+from bot.settings import forward_sighup
+from bot import handlers, metrics
 from bot.handlers import router
+from bot.webhook import run_ingress, run_webhook
 
 
-async def main():
-    bot = Bot(
-        token=BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode="HTML")
+def build_bots() -> list[Bot]:
+    """По боту на каждый токен; все ходят в Bot API через одну сессию
+    aiohttp, т.е. через один пул соединений."""
+    session = AiohttpSession(limit=HTTP_POOL_LIMIT)
+    return [
+        Bot(
+            token=tenant.token,
+            session=session,
+            default=DefaultBotProperties(parse_mode="HTML"),
+        )
+        for tenant in handlers.tenants
+    ]
+
+
+def build_dispatcher(shard: tuple[int, int] | None = None) -> Dispatcher:
+    storage = SQLiteStorage(
+        FSM_DB,
+        flush_interval=FSM_FLUSH_INTERVAL,
+        ttl=FSM_SESSION_TTL,
+        shard=shard,
     )
-    dp = Dispatcher(storage=MemoryStorage())
+    dp = Dispatcher(storage=storage)
     dp.include_router(router)
+    if THROTTLING:
+        handlers.throttling.install(dp)
+    return dp
+
+
+def setup_metrics(dp: Dispatcher, bots: list[Bot], port: int):
+    """Включает замеры хендлеров и Bot API и поднимает /metrics."""
+    metrics.instrument_router(router)
+    # у ботов общая сессия — замеряем её один раз
+    for bot in {id(bot.session): bot for bot in bots}.values():
+        metrics.instrument_bot(bot)
+    metrics.registry.add_collector(lambda: {
+        "bot_outbox_depth": handlers.outbox.depth,
+        "bot_outbox_sent_total": handlers.outbox.sent,
+        "bot_outbox_failed_total": handlers.outbox.failed,
+        "bot_outbox_retried_total": handlers.outbox.retried,
+        "bot_phone_index_size": len(handlers.phone_index),
+        "bot_name_index_size": len(handlers.name_index),
+        "bot_photo_index_size": len(handlers.photo_index),
+        "bot_pending_tracked": len(handlers.pending_lifecycle),
+        "bot_pending_expired_total": handlers.pending_lifecycle.expired,
+        "bot_throttle_passed_total": handlers.throttling.passed,
+    })
+    metrics.registry.add_collector(lambda: {
+        f"bot_throttle_dropped_{kind}_total": count
+        for kind, count in handlers.throttling.dropped.items()
+    })
+    metrics.registry.add_collector(lambda: {
+        f"bot_subscription_cache_{name}": value
+        for name, value in handlers.subscription_cache.stats().items()
+    })
+    profiler = metrics.SamplingProfiler() if METRICS_PROFILER else None
+    runners = []
+
+    async def start_server():
+        runners.append(
+            await metrics.start_metrics_server(METRICS_HOST, port, profiler)
+        )
+
+    async def stop_server():
+        for runner in runners:
+            await runner.cleanup()
+
+    dp.startup.register(start_server)
+    dp.shutdown.register(stop_server)
+
+
+async def worker(index: int):
+    """Процесс-воркер: получает апдейты от входного процесса по localhost."""
+    # сессии FSM — только пользователей этого воркера (см. update_shard_key)
+    dp = build_dispatcher(shard=(index, WORKER_PROCESSES))
+    bot, = build_bots()
+    if METRICS_PORT:
+        setup_metrics(dp, [bot], METRICS_PORT + 1 + index)
+    await run_webhook(
+        dp,
+        bot,
+        url=None,
+        secret=None,
+        host="127.0.0.1",
+        port=WORKER_BASE_PORT + index,
+        path=WEBHOOK_PATH,
+        workers=WEBHOOK_WORKERS,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+    )
 
-    await dp.start_polling(bot)
+
+def stop_on_sigterm(signum, frame):
+    # SIGTERM от systemd — штатная остановка, как Ctrl+C
+    raise KeyboardInterrupt
+
+
+def worker_process(index: int):
+    logging.basicConfig(level=logging.INFO)
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
+    try:
+        asyncio.run(worker(index))
+    except KeyboardInterrupt:
+        pass
+
+
+async def main():
+    bots = build_bots()
+    bot = bots[0]
+
+    if BOT_MODE == "webhook" and WORKER_PROCESSES > 1:
+        await run_ingress(
+            bot,
+            url=WEBHOOK_URL,
+            secret=WEBHOOK_SECRET,
+            host=WEBHOOK_HOST,
+            port=WEBHOOK_PORT,
+            path=WEBHOOK_PATH,
+            worker_urls=[
+                f"http://127.0.0.1:{WORKER_BASE_PORT + i}{WEBHOOK_PATH}"
+                for i in range(WORKER_PROCESSES)
+            ],
+            allowed_updates=router.resolve_used_update_types(),
+        )
+        return
+
+    dp = build_dispatcher()
+    if METRICS_PORT:
+        setup_metrics(dp, bots, METRICS_PORT)
+
+    if BOT_MODE == "webhook":
+        await run_webhook(
+            dp,
+            bot,
+            url=WEBHOOK_URL,
+            secret=WEBHOOK_SECRET,
+            host=WEBHOOK_HOST,
+            port=WEBHOOK_PORT,
+            path=WEBHOOK_PATH,
+            workers=WEBHOOK_WORKERS,
+            queue_size=WEBHOOK_QUEUE_SIZE,
+        )
+    else:
+        await asyncio.gather(*(bot.delete_webhook() for bot in bots))
+        # один диспетчер и один event loop на все боты
+        await dp.start_polling(*bots)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    logging.basicConfig(level=logging.INFO)
+    if BOT_MODE == "webhook" and len(handlers.tenants) > 1:
+        raise SystemExit("Несколько ботов (TENANTS_FILE) работают только в режиме polling")
+
+    processes = []
+    if BOT_MODE == "webhook" and WORKER_PROCESSES > 1:
+        signal.signal(signal.SIGTERM, stop_on_sigterm)
+        ctx = multiprocessing.get_context("spawn")
+        for i in range(WORKER_PROCESSES):
+            process = ctx.Process(target=worker_process, args=(i,), daemon=True)
+            process.start()
+            processes.append(process)
+        # настройки перечитывают воркеры; входной процесс их не использует
+        forward_sighup(lambda: [p.pid for p in processes if p.is_alive()])
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
@@ -0,0 +1,50 @@
+import pytest
+
+from bot.e164 import COUNTRY_CODES, RULES, code_for_country, phone_prefix, to_e164
+
+
+def sample(rule, length=None):
+    """Национальный номер допустимой длины, не начинающийся с префикса."""
+    length = length or min(rule.lengths)
+    return ("5" + "1234567890123")[:length]
+
+
+@pytest.mark.parametrize("rule", RULES, ids=lambda rule: rule.code)
+def test_rule(rule):
+    national = sample(rule)
+    expected = f"+{rule.code}{national}"
+    assert rule.countries
+    for country in rule.countries:
+        code = code_for_country(country)
+        assert code == rule.code
+        assert to_e164(f"+{rule.code} {national}", code) == expected
+        assert to_e164(f"00{rule.code}{national}", code) == expected
+        assert to_e164(national, code) == expected
+        if rule.trunk:
+            assert to_e164(f"{rule.trunk} ({national[:3]}) {national[3:]}", code) == expected
+    # длина вне правила не разбирается
+    too_long = national + "0" * (max(rule.lengths) - len(national) + 1)
+    assert to_e164(f"+{rule.code}{too_long}") is None
+
+
+def test_every_rule_has_country():
+    assert set(COUNTRY_CODES.values()) == {rule.code for rule in RULES}
+
+
+def test_unknown_country_requires_international_prefix():
+    assert code_for_country("Атлантида") is None
+    assert code_for_country("Другая страна") is None
+    assert to_e164("79781234567", None) is None
+    assert to_e164("+7 978 123-45-67", None) == "+79781234567"
+    assert to_e164("00381641234567", None) == "+381641234567"
+
+
+def test_national_number_of_listed_country_is_not_russian():
+    assert to_e164("0641234567", code_for_country("Сербия")) == "+381641234567"
+    assert to_e164("030 1234567", code_for_country("Германия")) == "+49301234567"
+    assert to_e164("1234567890", code_for_country("Германия")) == "+491234567890"
+
+
+def test_phone_prefix_without_country():
+    assert phone_prefix("8978", None) == "8978"
+    assert phone_prefix("8978") == "7978"
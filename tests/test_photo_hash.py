@@ -0,0 +1,117 @@
+import io
+import random
+
+import pytest
+
+from bot.photo_hash import BKTree, PhotoHashIndex, dhash, hamming, to_signed
+
+Image = pytest.importorskip("PIL.Image")
+from PIL import ImageDraw, ImageEnhance, ImageFilter  # noqa: E402
+
+# порог по умолчанию (PHOTO_HASH_DISTANCE)
+MAX_DISTANCE = PhotoHashIndex().max_distance
+
+
+def scene(seed: int, size=(1280, 960)):
+    """Картинка «как фото»: градиент и размытые цветные фигуры."""
+    rnd = random.Random(seed)
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rnd.randrange(size[0]), rnd.randrange(size[1])
+        r = rnd.randrange(60, 300)
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        shape = draw.ellipse if rnd.random() < 0.5 else draw.rectangle
+        shape((x - r, y - r, x + r, y + r), fill=color)
+    return image.filter(ImageFilter.GaussianBlur(3))
+
+
+def jpeg(image, quality: int = 85) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+VARIANTS = {
+    "resize_half": lambda image: jpeg(image.resize((640, 480))),
+    "thumbnail": lambda image: jpeg(image.resize((90, 67))),
+    "recompress_q30": lambda image: jpeg(image, quality=30),
+    "double_recompress": lambda image: jpeg(
+        Image.open(io.BytesIO(jpeg(image.resize((800, 600)), quality=60))), quality=40
+    ),
+    "brighter": lambda image: jpeg(ImageEnhance.Brightness(image).enhance(1.1)),
+}
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+@pytest.mark.parametrize("seed", range(4))
+def test_duplicate_within_threshold(seed, variant):
+    original = scene(seed)
+    distance = hamming(dhash(jpeg(original)), dhash(VARIANTS[variant](original)))
+    assert distance <= MAX_DISTANCE
+
+
+def test_different_photos_far_apart():
+    hashes = [dhash(jpeg(scene(seed))) for seed in range(8)]
+    distances = [
+        hamming(a, b) for i, a in enumerate(hashes) for b in hashes[i + 1:]
+    ]
+    # с запасом: разные фото не должны быть даже на двойном пороге
+    assert min(distances) > 2 * MAX_DISTANCE
+
+
+def test_index_finds_resized_copy_only():
+    index = PhotoHashIndex()
+    try:
+        for seed in range(6):
+            index.add(dhash(jpeg(scene(seed))), f"r{seed}", f"f{seed}")
+        found = index.find_similar(dhash(VARIANTS["resize_half"](scene(3))))
+        assert [(report, file) for _, report, file in found] == [("r3", "f3")]
+        assert index.find_similar(dhash(jpeg(scene(3))), exclude_report="r3") == []
+    finally:
+        index.close()
+
+
+def flip_bits(rnd: random.Random, value: int, count: int) -> int:
+    for bit in rnd.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 6, 12])
+def test_bktree_matches_brute_force(max_distance):
+    rnd = random.Random(max_distance)
+    # кластеры близких хэшей (как копии одного фото) плюс случайный шум
+    centers = [rnd.getrandbits(64) for _ in range(40)]
+    values = [
+        flip_bits(rnd, rnd.choice(centers), rnd.randrange(0, 10)) for _ in range(1500)
+    ]
+    values += [rnd.getrandbits(64) for _ in range(500)]
+    values += values[:50]  # совпадающие хэши
+    tree = BKTree()
+    for item, value in enumerate(values):
+        tree.add(value, item)
+    assert len(tree) == len(values)
+
+    queries = [flip_bits(rnd, c, rnd.randrange(0, 8)) for c in centers]
+    queries += [rnd.getrandbits(64) for _ in range(20)]
+    for query in queries:
+        expected = sorted(
+            (hamming(query, value), item)
+            for item, value in enumerate(values)
+            if hamming(query, value) <= max_distance
+        )
+        assert sorted(tree.search(query, max_distance)) == expected
+
+
+def test_bulk_load_from_signed_hashes():
+    rnd = random.Random(1)
+    values = [rnd.getrandbits(64) | (1 << 63) for _ in range(10)]
+    index = PhotoHashIndex()
+    try:
+        index.bulk_load(
+            (f"r{i}", f"f{i}", to_signed(value)) for i, value in enumerate(values)
+        )
+        assert index.find_similar(values[4])[0] == (0, "r4", "f4")
+    finally:
+        index.close()